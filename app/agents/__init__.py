@@ -3,28 +3,43 @@ Agents Package
 
 Simple AI agents using Google Gemini API (google-genai SDK).
 No complex frameworks - just clean, direct API calls.
+
+Exports are loaded lazily (PEP 562) so importing the package does not pull
+in google-genai until an agent is actually used.
 """
 
-from app.agents.scam_detector import detect_scam, ScamAnalysis
-from app.agents.honeypot_persona import generate_response, get_fallback_response, PERSONAS
-from app.agents.intelligence_extractor import (
-    extract_intelligence,
-    generate_notes,
-    extract_with_regex,
-    ExtractedIntelligence
-)
+import importlib
 
-__all__ = [
+# Public name -> defining submodule (single source of truth for __all__)
+_EXPORTS = {
     # Scam Detection
-    "detect_scam",
-    "ScamAnalysis",
+    "detect_scam": "app.agents.scam_detector",
+    "ScamAnalysis": "app.agents.scam_detector",
     # Honeypot Persona
-    "generate_response",
-    "get_fallback_response",
-    "PERSONAS",
+    "generate_response": "app.agents.honeypot_persona",
+    "get_fallback_response": "app.agents.honeypot_persona",
+    "PERSONAS": "app.agents.honeypot_persona",
     # Intelligence Extraction
-    "extract_intelligence",
-    "generate_notes",
-    "extract_with_regex",
-    "ExtractedIntelligence",
-]
+    "extract_intelligence": "app.agents.intelligence_extractor",
+    "generate_notes": "app.agents.intelligence_extractor",
+    "extract_with_regex": "app.agents.intelligence_extractor",
+    "ExtractedIntelligence": "app.models.intelligence",
+    # Single-call Detection + Reply + Extraction
+    "analyze_combined": "app.agents.combined",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """Import the defining submodule on first access and cache the export."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,157 @@
+"""
+Combined Analysis Agent
+
+Runs scam detection, the persona reply and intelligence extraction as one
+Gemini call with a single structured-output schema, instead of three
+separate requests per turn. Enabled with COMBINED_ANALYSIS=true.
+"""
+
+import logging
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+from app.services.gemini import generate_json
+from app.agents.scam_detector import DETECTION_GUIDE, ScamAnalysis
+from app.agents.honeypot_persona import (
+    build_conversation_tail,
+    clean_reply,
+    get_persona_prompt,
+    select_persona_for_session,
+    with_summary,
+)
+from app.agents.intelligence_extractor import EXTRACTION_GUIDE, ExtractionSchema
+from app.models.intelligence import ExtractedIntelligence
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class CombinedSchema(BaseModel):
+    """Structured-output schema for the combined call."""
+    is_scam: bool
+    confidence: float
+    scam_type: str
+    indicators: List[str]
+    intelligence: ExtractionSchema
+    reply: str
+
+
+@dataclass
+class CombinedAnalysis:
+    """Result of one combined call."""
+    scam: ScamAnalysis
+    reply: str
+    intelligence: ExtractedIntelligence
+
+
+# Task instructions are identical for every turn, so they lead the prompt;
+# the persona prompt (one of a few) and the conversation follow
+COMBINED_PROMPT_HEADER = """You are handling one incoming message in an ongoing conversation. Complete ALL THREE tasks below and answer in the response schema.
+
+TASK 1 - SCAM DETECTION (is_scam, confidence 0.0-1.0, scam_type, indicators)
+Decide whether the conversation is a scam/fraud attempt.
+
+""" + DETECTION_GUIDE + """
+
+TASK 2 - INTELLIGENCE EXTRACTION (intelligence)
+Extract ALL scam-related intelligence from the conversation and the latest message.
+
+""" + EXTRACTION_GUIDE + """
+
+Fill every list, leaving lists empty when nothing is found.
+
+TASK 3 - REPLY (reply)
+Write your next message in character as the person described below. Plain text only, no role label.
+
+"""
+
+
+def build_combined_prompt(
+    persona_prompt: str,
+    conversation: str,
+    message: str,
+    name: str,
+    turn_count: int
+) -> str:
+    """Assemble the combined prompt (static header, persona, then this turn)."""
+    return "".join((
+        COMBINED_PROMPT_HEADER, persona_prompt,
+        "\n\nCONVERSATION SO FAR (", str(turn_count), " messages exchanged):\n",
+        conversation,
+        '\n\nSCAMMER JUST SAID:\n"', message, '"\n\n',
+        "Reply as ", name, ". Do NOT repeat ANY question or excuse you already used. Keep it to 2-3 sentences."
+    ))
+
+
+async def analyze_combined(
+    message: str,
+    conversation_history: List[Dict],
+    persona_type: str = "elderly",
+    session_id: str = "",
+    summary: str = "",
+    up_to: Optional[int] = None
+) -> CombinedAnalysis:
+    """
+    Detect, reply and extract for one turn with a single Gemini call.
+
+    Args:
+        message: The scammer's latest message
+        conversation_history: Earlier messages (excluding the latest one)
+        persona_type: Preferred persona
+        session_id: Session ID (persona language and conversation tail cache)
+        summary: Running summary of messages older than the window
+        up_to: Use only conversation_history[:up_to] (avoids copying a slice)
+
+    Returns:
+        CombinedAnalysis with the verdict, reply and LLM-found intelligence
+
+    Raises:
+        ValueError: If the response is missing or has no reply, so the caller
+            can fall back to the separate calls
+    """
+    persona = select_persona_for_session(session_id, persona_type)
+    history_count = len(conversation_history) if up_to is None else up_to
+    conversation = with_summary(build_conversation_tail(
+        session_id, conversation_history, f"YOU ({persona['name']})", history_count
+    ) or "(This is the start of the conversation)", summary)
+
+    prompt = build_combined_prompt(
+        persona_prompt=get_persona_prompt(persona),
+        conversation=conversation,
+        message=message,
+        name=persona["name"],
+        turn_count=history_count + 1
+    )
+
+    result = await generate_json(
+        prompt=prompt,
+        model=settings.model_name,
+        temperature=settings.agent_temperature,  # The reply needs variety
+        thinking_level="low",
+        response_schema=CombinedSchema,
+        raise_errors=True
+    )
+    if not result:
+        raise ValueError("combined analysis returned no JSON")
+
+    reply = clean_reply(str(result.get("reply") or ""), persona)
+    found = result.get("intelligence") or {}
+    analysis = CombinedAnalysis(
+        scam=ScamAnalysis(
+            is_scam=bool(result.get("is_scam", False)),
+            confidence=float(result.get("confidence", 0.0)),
+            scam_type=result.get("scam_type", "unknown"),
+            indicators=result.get("indicators", [])
+        ),
+        reply=reply,
+        intelligence=ExtractedIntelligence(**{
+            name: found.get(name, []) for name in ExtractionSchema.model_fields
+        })
+    )
+
+    logger.info("[%s] Combined analysis: is_scam=%s, confidence=%.2f, reply: %.100s...",
+                session_id, analysis.scam.is_scam, analysis.scam.confidence, reply)
+    return analysis
@@ -4,28 +4,69 @@ Honeypot Persona Agent
 Generates believable human responses to engage scammers and extract intelligence.
 """
 
+import re
+import zlib
+import hashlib
 import logging
 import random
-from typing import List, Dict
+from collections import deque
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 
-from app.services.gemini import generate_text
+from app.services.gemini import generate_text, generate_text_stream
+from app.services.cache import TTLCache
 from app.config import get_settings
 
+__all__ = [
+    "PERSONAS",
+    "LANGUAGES",
+    "get_language_for_session",
+    "select_persona_for_session",
+    "get_persona_prompt",
+    "build_conversation_tail",
+    "forget_conversation_tail",
+    "build_honeypot_prompt",
+    "summary_due",
+    "summarize_history",
+    "with_summary",
+    "clean_reply",
+    "generate_response",
+    "get_fallback_response",
+    "is_fallback_response",
+    "pick_generic_response",
+]
+
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Scam scripts repeat across sessions, so identical prompts can reuse a reply.
+# Only used at low temperatures, where a repeated reply is what the model
+# would have produced anyway; off at the default AGENT_TEMPERATURE (1.0)
+# and the .env.example value (0.7).
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.5
+RESPONSE_CACHE_ENABLED = settings.agent_temperature <= RESPONSE_CACHE_MAX_TEMPERATURE
+_response_cache = TTLCache(
+    maxsize=settings.response_cache_size if RESPONSE_CACHE_ENABLED else 0,
+    ttl=settings.response_cache_ttl
+)
+
 
 # Language modes - randomly selected per session
 LANGUAGES = ["hinglish", "english"]
 
 
+@lru_cache(maxsize=4096)
+def _language_for_session_id(session_id: str) -> str:
+    # adler32 is stable across processes (unlike hash()), so every instance
+    # picks the same language for a session
+    return LANGUAGES[zlib.adler32(session_id.encode()) % len(LANGUAGES)]
+
+
 def get_language_for_session(session_id: str) -> str:
     """Randomly select language based on session ID (consistent within session)."""
     if not session_id:
         return random.choice(LANGUAGES)
-    # Use sum of character codes for more varied distribution
-    char_sum = sum(ord(c) for c in session_id)
-    return LANGUAGES[char_sum % 2]
+    return _language_for_session_id(session_id)
 
 
 # Persona definitions - more varied and realistic
@@ -167,19 +208,31 @@ def select_persona_for_session(session_id: str, preferred_type: str = "elderly")
             return PERSONAS["elderly_english"]
 
 
-def get_persona_prompt(persona: dict) -> str:
-    """Get the persona system prompt."""
+def _join_traits(persona: dict) -> str:
+    """Bullet list of persona traits."""
+    return "\n".join("- " + trait for trait in persona["traits"])
+
+
+def _join_examples(persona: dict) -> str:
+    """Bullet list of quoted example responses."""
+    return "\n".join(f'- "{ex}"' for ex in persona["example_responses"])
+
+
+def _build_persona_prompt(persona: dict) -> str:
+    """Render the full persona system prompt."""
+    traits_block = _join_traits(persona)
+    examples_block = _join_examples(persona)
     
     return f"""You are {persona['name']}, a {persona['age']}-year-old {persona['background']}.
 
 YOUR PERSONALITY:
-{chr(10).join('- ' + trait for trait in persona['traits'])}
+{traits_block}
 
 LANGUAGE AND SPEAKING RULES:
 {persona['speaking_rules']}
 
 EXAMPLE RESPONSES (use similar style, not exact copies):
-{chr(10).join('- "' + ex + '"' for ex in persona['example_responses'])}
+{examples_block}
 
 CRITICAL RULES - FOLLOW EXACTLY:
 1. NEVER reveal you are an AI, bot, or automated system.
@@ -229,47 +282,236 @@ RED FLAGS TO CALL OUT (naturally, as confusion):
 Keep responses 2-3 sentences MAX. Stay in character. Use a COMPLETELY DIFFERENT tactic each turn. Be very persistent in asking for their name, ID, and phone number."""
 
 
-HONEYPOT_PROMPT = """{persona_prompt}
+def _build_prefix_re(name: str) -> "re.Pattern":
+    """Match a leading role label ("YOU:", "RESPONSE:", "<name>:") on a reply."""
+    return re.compile(
+        r"^\s*(?:YOUR\s+RESPONSE|RESPONSE|YOU|ME|" + re.escape(name) + r")\s*:\s*",
+        re.IGNORECASE
+    )
+
+
+# Persona prompts are static, so render them once at import.
+# name -> (persona dict, system prompt, role prefix pattern); kept apart
+# from PERSONAS so those stay plain, serializable data.
+_PERSONA_ARTIFACTS = {
+    persona["name"]: (persona, _build_persona_prompt(persona), _build_prefix_re(persona["name"]))
+    for persona in PERSONAS.values()
+}
+
+
+def _persona_artifacts(persona: dict) -> Optional[tuple]:
+    """Prebuilt (prompt, prefix pattern) for an entry of PERSONAS, else None."""
+    entry = _PERSONA_ARTIFACTS.get(persona["name"])
+    if entry is None or entry[0] is not persona:
+        return None
+    return entry[1:]
+
+
+def get_persona_prompt(persona: dict) -> str:
+    """Get the persona system prompt (prebuilt for entries in PERSONAS)."""
+    artifacts = _persona_artifacts(persona)
+    return artifacts[0] if artifacts else _build_persona_prompt(persona)
+
+
+# Transcript labels by sender (anyone else is the persona)
+_ROLE_LABELS = {"SCAMMER": "THEM"}
+
+# Prompt context: at most this many recent messages, trimmed further
+# (oldest first) to stay under a rough character budget
+HISTORY_WINDOW = 8
+CONVERSATION_CHAR_BUDGET = 6000
+
+# session_id -> (messages formatted so far, deque of recent formatted lines,
+# (sender, text) of the last formatted message)
+_conversation_tails = TTLCache(maxsize=10000, ttl=settings.session_timeout)
+
+
+def _message_key(msg: Dict) -> tuple:
+    return (msg.get("sender"), msg.get("text"))
+
 
-CONVERSATION SO FAR ({turn_count} messages exchanged):
-{conversation}
+def forget_conversation_tail(session_id: str):
+    """Drop the cached conversation tail of an ended session."""
+    _conversation_tails.delete(session_id)
 
-SCAMMER JUST SAID:
-"{message}"
 
-Respond as {name}. CRITICAL: Read the conversation above carefully. Do NOT repeat ANY question or excuse you already used. Use a COMPLETELY NEW approach this turn. Keep it to 2-3 sentences.
+def build_conversation_tail(
+    session_id: str,
+    conversation_history: List[Dict],
+    you_label: str,
+    up_to: Optional[int] = None
+) -> str:
+    """
+    Render the recent conversation for the prompt.
+    
+    Formatted lines are kept per session, so each turn only formats the
+    messages added since the previous call instead of the whole window.
+    The cached lines are only reused while the last message they cover is
+    unchanged (a reused session id starts over). Only the first up_to
+    messages are used when given.
+    """
+    count = len(conversation_history) if up_to is None else up_to
+    entry = _conversation_tails.get(session_id) if session_id else None
+    if (entry is None or entry[0] > count or count - entry[0] > HISTORY_WINDOW
+            or (entry[0] and _message_key(conversation_history[entry[0] - 1]) != entry[2])):
+        start = max(0, count - HISTORY_WINDOW)
+        lines = deque(maxlen=HISTORY_WINDOW)
+    else:
+        start, lines, _ = entry
+    
+    lines.extend(
+        f"{_ROLE_LABELS.get(msg.get('sender', 'unknown').upper(), you_label)}: {msg.get('text', '')}"
+        for msg in conversation_history[start:count]
+    )
+    size = sum(map(len, lines)) + len(lines) - 1
+    while len(lines) > 1 and size > CONVERSATION_CHAR_BUDGET:
+        size -= len(lines.popleft()) + 1
+    
+    if session_id:
+        last = _message_key(conversation_history[count - 1]) if count else None
+        _conversation_tails.set(session_id, (count, lines, last))
+    return "\n".join(lines)
+
+
+# Static fragments of the per-turn prompt, interleaved with
+# persona_prompt, turn_count, conversation, message and name
+HONEYPOT_PROMPT_PARTS = (
+    "\n\nCONVERSATION SO FAR (",
+    " messages exchanged):\n",
+    '\n\nSCAMMER JUST SAID:\n"',
+    '"\n\nRespond as ',
+    ". CRITICAL: Read the conversation above carefully. Do NOT repeat ANY question or excuse you already used. Use a COMPLETELY NEW approach this turn. Keep it to 2-3 sentences.\n\nYOUR RESPONSE:",
+)
+
+
+def build_honeypot_prompt(
+    persona_prompt: str,
+    conversation: str,
+    message: str,
+    name: str,
+    turn_count: int
+) -> str:
+    """Assemble the per-turn prompt in a single join (no template parsing)."""
+    parts = HONEYPOT_PROMPT_PARTS
+    return "".join((
+        persona_prompt, parts[0], str(turn_count), parts[1], conversation,
+        parts[2], message, parts[3], name, parts[4]
+    ))
+
+
+# Older turns drop out of the window above, so long conversations keep a
+# running summary of them for the prompt. It is refreshed (incrementally,
+# from the previous summary plus the messages since) before the messages it
+# last covered leave the window; a turn adds two messages.
+SUMMARY_REFRESH_MESSAGES = HISTORY_WINDOW - 2
 
-YOUR RESPONSE:"""
+SUMMARY_PROMPT = """Update the running summary of this conversation between a suspected scammer (THEM) and you (YOU).
+
+Keep it to one short paragraph. Include:
+- What THEY claimed and asked for, and every detail they shared (names, numbers, IDs, links, accounts)
+- Every question, excuse and stalling tactic YOU already used, so none is repeated
+
+SUMMARY SO FAR:
+{summary}
+
+NEW MESSAGES:
+{messages}
+
+UPDATED SUMMARY:"""
+
+
+def summary_due(message_count: int, summary_upto_idx: int) -> bool:
+    """Whether the running summary should be refreshed this turn."""
+    threshold = settings.history_summary_after
+    if threshold <= 0 or message_count < threshold:
+        return False
+    return message_count - summary_upto_idx >= SUMMARY_REFRESH_MESSAGES
+
+
+async def summarize_history(previous_summary: str, messages: List[Dict]) -> str:
+    """
+    Fold new messages into the running conversation summary.
+    
+    Args:
+        previous_summary: Summary of the messages before these ("" if none)
+        messages: Messages not yet covered by the summary
+        
+    Returns:
+        Updated one-paragraph summary
+    """
+    lines = "\n".join(
+        f"{_ROLE_LABELS.get(msg.get('sender', 'unknown').upper(), 'YOU')}: {msg.get('text', '')}"
+        for msg in messages
+    )
+    summary = await generate_text(
+        prompt=SUMMARY_PROMPT.format(summary=previous_summary or "(none yet)", messages=lines),
+        model=settings.model_name,
+        temperature=0.2,
+        max_tokens=settings.agent_max_output_tokens,
+        thinking_level="minimal"
+    )
+    summary = (summary or "").strip()
+    if not summary:
+        raise ValueError("empty summary from Gemini")
+    return summary
+
+
+def with_summary(conversation: str, summary: str) -> str:
+    """Prefix the recent conversation with the summary of older turns."""
+    if not summary:
+        return conversation
+    return f"(Summary of earlier messages: {summary})\n\n{conversation}"
+
+
+def clean_reply(text: str, persona: dict) -> str:
+    """
+    Strip surrounding quotes and a leading role prefix from a model reply.
+    
+    Raises:
+        ValueError: If the reply is empty
+    """
+    response = text.strip()
+    if not response:
+        raise ValueError("empty response from Gemini")
+    if response.startswith('"') and response.endswith('"'):
+        response = response[1:-1]
+    # Remove any role prefix
+    artifacts = _persona_artifacts(persona)
+    prefix_re = artifacts[1] if artifacts else _build_prefix_re(persona["name"])
+    return prefix_re.sub("", response, count=1)
 
 
 async def generate_response(
     message: str,
     conversation_history: List[Dict],
     persona_type: str = "elderly",
-    session_id: str = ""
+    session_id: str = "",
+    summary: str = "",
+    up_to: Optional[int] = None
 ) -> str:
     """
     Generate a honeypot response to engage the scammer.
+    
+    summary covers messages older than the conversation window (see
+    summarize_history); it is prepended to the recent messages. When up_to
+    is given, only conversation_history[:up_to] is treated as history (the
+    session's message list can be passed as is, without copying a slice).
     """
     # Select persona based on session (consistent language per session)
     persona = select_persona_for_session(session_id, persona_type)
     persona_prompt = get_persona_prompt(persona)
     
-    # Build conversation text (last 8 messages for context)
-    conv_lines = []
-    for msg in conversation_history[-8:]:
-        sender = msg.get("sender", "unknown").upper()
-        text = msg.get("text", "")
-        if sender == "SCAMMER":
-            conv_lines.append(f"THEM: {text}")
-        else:
-            conv_lines.append(f"YOU ({persona['name']}): {text}")
-    conversation = "\n".join(conv_lines) if conv_lines else "(This is the start of the conversation)"
+    # Build conversation text (recent messages for context)
+    you_label = f"YOU ({persona['name']})"
+    history_count = len(conversation_history) if up_to is None else up_to
+    conversation = with_summary(build_conversation_tail(
+        session_id, conversation_history, you_label, history_count
+    ) or "(This is the start of the conversation)", summary)
     
     # Calculate current turn (number of messages so far + the current one)
-    turn_count = len(conversation_history) + 1
+    turn_count = history_count + 1
     
-    prompt = HONEYPOT_PROMPT.format(
+    prompt = build_honeypot_prompt(
         persona_prompt=persona_prompt,
         conversation=conversation,
         message=message,
@@ -277,113 +519,149 @@ async def generate_response(
         turn_count=turn_count
     )
     
+    use_cache = RESPONSE_CACHE_ENABLED
+    if use_cache:
+        cache_key = hashlib.blake2b(prompt.encode(), digest_size=16).digest()
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("[%s] Response cache hit", session_id)
+            return cached
+    
     try:
-        response = await generate_text(
+        chunks = []
+        async for chunk in generate_text_stream(
             prompt=prompt,
             model=settings.model_name,
             temperature=settings.agent_temperature,  # Higher for varied, natural responses
-            max_tokens=5000,    # Allow complete responses
+            max_tokens=settings.agent_max_output_tokens,  # Replies are 2-3 sentences
             thinking_level="low"  # Chat responses don't need deep reasoning
-        )
+        ):
+            if not chunks:
+                logger.debug("[%s] First response chunk received", session_id)
+            chunks.append(chunk)
         
-        # Clean up response
-        response = response.strip()
-        if response.startswith('"') and response.endswith('"'):
-            response = response[1:-1]
-        # Remove any role prefixes
-        for prefix in ["YOU:", "ME:", f"{persona['name'].upper()}:", "RESPONSE:", f"{persona['name']}:", "YOUR RESPONSE:"]:
-            if response.upper().startswith(prefix.upper()):
-                response = response[len(prefix):].strip()
+        # Clean up response (once, after the stream has closed)
+        response = clean_reply("".join(chunks), persona)
         
-        logger.info(f"[{session_id}] Persona: {persona['name']} ({persona['language']}), Response: {response[:100]}...")
+        logger.info("[%s] Persona: %s (%s), Response: %.100s...",
+                    session_id, persona["name"], persona["language"], response)
+        if use_cache and response:
+            _response_cache.set(cache_key, response)
         return response
         
     except Exception as e:
-        logger.error(f"[{session_id}] Response generation error: {e}")
+        logger.error("[%s] Response generation error: %s", session_id, e)
         return get_fallback_response(message, persona.get("language", "english"))
 
 
+# Generic stalling replies when no keyword-specific fallback applies
+GENERIC_FALLBACKS: Dict[str, Tuple[str, ...]] = {
+    "hinglish": (
+        "Mujhe samajh nahi aa raha. Thoda aur explain kariye.",
+        "Kya? Dobara boliye please, suna nahi properly.",
+        "Ek minute ruko, koi door pe hai.",
+        "Main confuse ho gayi. Step by step batao please."
+    ),
+    "english": (
+        "I'm sorry, I don't quite understand. Could you explain again?",
+        "What was that? Could you repeat please?",
+        "Hold on a moment, someone's at the door.",
+        "I'm a bit confused. Can you tell me step by step?"
+    )
+}
+
+_RNG = random.Random()
+
+# Keyword-specific fallback replies (Hinglish)
+HINGLISH_FALLBACKS: Dict[str, Tuple[str, ...]] = {
+    "otp": (
+        "OTP? Phone pe kuch number aaya hai, wo batana hai kya?",
+        "Ruko, phone check karti hoon. Kuch message aaya hai."
+    ),
+    "block": (
+        "Kya? Account block ho jayega? Lekin kyun? Maine kuch galat nahi kiya!",
+        "Please block mat karo! Mere saare paise usme hai!"
+    ),
+    "bank": (
+        "Kaun sa account? Mera SBI mein hai. Wo wala?",
+        "Bank ka kaam hai to theek hai, bataiye kya karna hai."
+    ),
+    "upi": (
+        "UPI ID matlab wo Google Pay wala? Ek second, app kholti hoon.",
+        "Haan hai mere paas UPI. Kya karna hai?"
+    ),
+    "transfer": (
+        "Paise bhejne hai? Kitne? Aur kahan bhejun?",
+        "Transfer? Pehle batao kisko bhejne hai."
+    ),
+    "verify": (
+        "Verify karna hai? Theek hai, bataiye kya documents chahiye.",
+        "Haan haan, verify kar dete hai. Kya karna padega?"
+    )
+}
+
+# Keyword-specific fallback replies (English)
+ENGLISH_FALLBACKS: Dict[str, Tuple[str, ...]] = {
+    "otp": (
+        "OTP? I received some numbers on my phone. Is that what you need?",
+        "Hold on, let me check my messages. Something came through."
+    ),
+    "block": (
+        "Block my account? But why? I haven't done anything wrong!",
+        "Please don't block it! All my savings are in there!"
+    ),
+    "bank": (
+        "Which account are you referring to? I have one with SBI.",
+        "If this is bank related, please tell me what I need to do."
+    ),
+    "upi": (
+        "UPI? You mean Google Pay? Let me open the app.",
+        "Yes, I have UPI. What do you need me to do?"
+    ),
+    "transfer": (
+        "Transfer money? How much and where should I send it?",
+        "Send money to whom? I need more details please."
+    ),
+    "verify": (
+        "Verification? Okay, tell me what documents you need.",
+        "Yes, I want to verify. What should I do?"
+    )
+}
+
+# Fallback buckets in priority order
+FALLBACK_KEYWORDS = ("otp", "block", "bank", "upi", "transfer", "verify")
+
+
+# Every canned reply, to tell fallbacks apart from generated replies
+FALLBACK_REPLIES = frozenset(
+    reply
+    for pool in (GENERIC_FALLBACKS, HINGLISH_FALLBACKS, ENGLISH_FALLBACKS)
+    for replies in pool.values()
+    for reply in replies
+)
+
+
+def is_fallback_response(text: str) -> bool:
+    """Whether text is one of the canned fallback replies."""
+    return text in FALLBACK_REPLIES
+
+
 def get_fallback_response(message: str, language: str = "english") -> str:
     """Get contextual fallback response when API fails."""
     message_lower = message.lower()
     
-    # Hinglish fallbacks
-    hinglish_fallbacks = {
-        "otp": [
-            "OTP? Phone pe kuch number aaya hai, wo batana hai kya?",
-            "Ruko, phone check karti hoon. Kuch message aaya hai."
-        ],
-        "block": [
-            "Kya? Account block ho jayega? Lekin kyun? Maine kuch galat nahi kiya!",
-            "Please block mat karo! Mere saare paise usme hai!"
-        ],
-        "bank": [
-            "Kaun sa account? Mera SBI mein hai. Wo wala?",
-            "Bank ka kaam hai to theek hai, bataiye kya karna hai."
-        ],
-        "upi": [
-            "UPI ID matlab wo Google Pay wala? Ek second, app kholti hoon.",
-            "Haan hai mere paas UPI. Kya karna hai?"
-        ],
-        "transfer": [
-            "Paise bhejne hai? Kitne? Aur kahan bhejun?",
-            "Transfer? Pehle batao kisko bhejne hai."
-        ],
-        "verify": [
-            "Verify karna hai? Theek hai, bataiye kya documents chahiye.",
-            "Haan haan, verify kar dete hai. Kya karna padega?"
-        ]
-    }
-    
-    # English fallbacks
-    english_fallbacks = {
-        "otp": [
-            "OTP? I received some numbers on my phone. Is that what you need?",
-            "Hold on, let me check my messages. Something came through."
-        ],
-        "block": [
-            "Block my account? But why? I haven't done anything wrong!",
-            "Please don't block it! All my savings are in there!"
-        ],
-        "bank": [
-            "Which account are you referring to? I have one with SBI.",
-            "If this is bank related, please tell me what I need to do."
-        ],
-        "upi": [
-            "UPI? You mean Google Pay? Let me open the app.",
-            "Yes, I have UPI. What do you need me to do?"
-        ],
-        "transfer": [
-            "Transfer money? How much and where should I send it?",
-            "Send money to whom? I need more details please."
-        ],
-        "verify": [
-            "Verification? Okay, tell me what documents you need.",
-            "Yes, I want to verify. What should I do?"
-        ]
-    }
-    
-    fallbacks = hinglish_fallbacks if language == "hinglish" else english_fallbacks
+    fallbacks = HINGLISH_FALLBACKS if language == "hinglish" else ENGLISH_FALLBACKS
     
-    # Find matching keyword
-    for keyword, responses in fallbacks.items():
+    # Find matching keyword (highest priority bucket wins; plain substring
+    # checks stop at the first hit and beat a regex pass on short messages)
+    for keyword in FALLBACK_KEYWORDS:
         if keyword in message_lower:
-            return random.choice(responses)
+            return _RNG.choice(fallbacks[keyword])
     
     # Generic fallbacks
-    if language == "hinglish":
-        generic = [
-            "Mujhe samajh nahi aa raha. Thoda aur explain kariye.",
-            "Kya? Dobara boliye please, suna nahi properly.",
-            "Ek minute ruko, koi door pe hai.",
-            "Main confuse ho gayi. Step by step batao please."
-        ]
-    else:
-        generic = [
-            "I'm sorry, I don't quite understand. Could you explain again?",
-            "What was that? Could you repeat please?",
-            "Hold on a moment, someone's at the door.",
-            "I'm a bit confused. Can you tell me step by step?"
-        ]
-    
-    return random.choice(generic)
+    return pick_generic_response(language)
+
+
+def pick_generic_response(language: str = "english") -> str:
+    """Pick a generic stalling reply for the given language."""
+    return _RNG.choice(GENERIC_FALLBACKS.get(language, GENERIC_FALLBACKS["english"]))
@@ -10,11 +10,19 @@ Extracts actionable intelligence from scam conversations:
 """
 
 import re
+import asyncio
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence, Tuple
 from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain
+from urllib.parse import urlsplit
 
-from app.services.gemini import generate_json, generate_text
+from pydantic import BaseModel
+
+from app.services.gemini import generate_text
+from app.services.llm_retry import generate_json_with_retry
+from app.services.regex import RE2_AVAILABLE, compile_pattern
 from app.config import get_settings
 from app.models.intelligence import ExtractedIntelligence
 
@@ -23,10 +31,12 @@ settings = get_settings()
 
 # Regex patterns for extraction
 PATTERNS = {
-    "bank_account": r'\b\d{9,18}\b',  # 9-18 digit numbers
+    "bank_account": r'\b\d{11,16}\b',  # account numbers are usually 11-16 digits
     "upi_id": r'\b[\w\.\-]+@(?:ybl|paytm|okaxis|oksbi|okhdfcbank|upi|apl|axl|ibl|sbi|icici|hdfc|axis|kotak|rbl|federal|indus|idbi|pnb|bob|canara|union|ubi|cub|kvb|tmb|iob|dcb|jkb|bandhan|fakebank|fakeupi)\b',
     "phone": r'\b(?:\+91[\-\s]?)?[6-9]\d{9}\b',
-    "url": r'https?://[^\s<>"\']+|(?:www\.)?[a-zA-Z0-9\-]+\.[a-zA-Z]{2,}(?:/[^\s<>"\']*)?',
+    # Bare domains start at a word boundary, so the engine does not retry them
+    # from every offset inside a long word (quadratic in the word's length)
+    "url": r'https?://[^\s<>"\']+|\b(?:www\.)?[a-zA-Z0-9\-]+\.[a-zA-Z]{2,}(?:/[^\s<>"\']*)?',
     "email": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b',
     "id_number": r'\b(?:ID|CASE|REF|POL|ORD|TRK|AWB)[\s\:\-]*[A-Z0-9]{5,15}\b',
 }
@@ -39,63 +49,104 @@ SCAM_KEYWORDS = [
     "rbi", "income tax", "customs", "cbi", "irs"
 ]
 
+# Compiled once at import instead of going through re's pattern cache per call
+_PATTERN_FLAGS = {"id_number": re.IGNORECASE}
+# (google-re2 when installed, see app.services.regex)
+COMPILED_PATTERNS = {
+    name: compile_pattern(pattern, _PATTERN_FLAGS.get(name, 0))
+    for name, pattern in PATTERNS.items()
+}
+
+# Case-sensitive patterns over the raw text, fused into one alternation and
+# scanned in a single pass. Where matches overlap, the leftmost wins, then
+# the earlier kind: emails before URLs stops the domain of an email being
+# reported as a phishing link, and digits before URLs keeps "9876543210.Call"
+# a phone number. With the stdlib engine, a leading lookahead (a character
+# every kind can start with) lets it skip whitespace and punctuation cheaply;
+# RE2 needs no such hint and does not support lookaround.
+_FUSED_KINDS = ("email", "bank_account", "phone", "url")
+_FUSED_ALTERNATION = "|".join(f"(?P<{kind}>{PATTERNS[kind]})" for kind in _FUSED_KINDS)
+if RE2_AVAILABLE:
+    _FUSED_RE = compile_pattern(_FUSED_ALTERNATION)
+else:
+    _FUSED_RE = re.compile(r"(?=[\w.%+\-])(?:" + _FUSED_ALTERNATION + ")")
+
+# Separators allowed inside a matched phone number (see PATTERNS["phone"])
+_PHONE_CLEAN_TABLE = str.maketrans("", "", " \t\n\r\f\v-")
+
+# Domains (and their subdomains) never reported as phishing links
+SAFE_HOSTS = frozenset(domain.lower() for domain in settings.safe_link_domains)
+# Subdomain suffixes (".google.com", ...) for a single str.endswith call
+_SAFE_SUFFIXES = tuple("." + domain for domain in SAFE_HOSTS)
+
+
+@lru_cache(maxsize=4096)
+def _is_safe_url(url: str) -> bool:
+    """Check the URL's host (not its full text) against SAFE_HOSTS."""
+    try:
+        host = urlsplit(url if "://" in url else "http://" + url).hostname or ""
+    except ValueError:
+        return False
+    return host in SAFE_HOSTS or host.endswith(_SAFE_SUFFIXES)
+
 
 def extract_with_regex(text: str) -> ExtractedIntelligence:
     """Extract intelligence using regex patterns."""
+    # Lower-cased once; reused by every case-insensitive scan below
     text_lower = text.lower()
     
-    # Extract bank accounts (filter out likely non-account numbers)
-    bank_accounts = []
-    for match in re.findall(PATTERNS["bank_account"], text):
-        # Filter: account numbers are usually 11-16 digits
-        if 11 <= len(match) <= 16:
-            bank_accounts.append(match)
-    
-    # Extract UPI IDs
-    upi_ids = re.findall(PATTERNS["upi_id"], text_lower)
+    # Extract bank accounts, phone numbers, URLs and emails in one pass
+    # (the bank pattern only admits 11-16 digit runs)
+    # (dicts rather than sets: deduplicated but kept in first-seen order)
+    bank_accounts, phone_numbers, phishing_links, email_addresses = {}, {}, {}, {}
+    for match in _FUSED_RE.finditer(text):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "email":
+            email_addresses[value] = None
+        elif kind == "bank_account":
+            bank_accounts[value] = None
+        elif kind == "phone":
+            phone_numbers[value.translate(_PHONE_CLEAN_TABLE)] = None
+        elif not _is_safe_url(value):
+            phishing_links[value] = None
     
-    # Extract phone numbers
-    phones = re.findall(PATTERNS["phone"], text)
-    phone_numbers = [re.sub(r'[\s\-]', '', p) for p in phones]
+    # Extract UPI IDs (most messages have no "@", and the C-level check
+    # is far cheaper than letting the pattern try every word)
+    upi_ids = dict.fromkeys(COMPILED_PATTERNS["upi_id"].findall(text_lower)) if "@" in text_lower else {}
     
-    # Extract URLs
-    urls = re.findall(PATTERNS["url"], text)
-    phishing_links = [url for url in urls if not any(
-        safe in url.lower() for safe in ["google.com", "microsoft.com", "apple.com"]
-    )]
-    
-    # Extract keywords
+    # Extract keywords. Plain substring checks on purpose: CPython's C
+    # fastsearch beats a single-pass regex alternation (or a pure-Python
+    # automaton) over the same text by several times.
     keywords = [kw for kw in SCAM_KEYWORDS if kw in text_lower]
     
-    # Extract emails
-    email_addresses = re.findall(PATTERNS["email"], text)
-    
     # Extract IDs (we'll roughly classify them based on prefix, or just lump them if LLM isn't taking over)
     # The LLM will do a better job at specific classifications, but we'll grab them broadly.
-    raw_ids = re.findall(PATTERNS["id_number"], text, re.IGNORECASE)
-    case_ids = [i for i in raw_ids if any(x in i.upper() for x in ["CASE", "REF"])]
-    policy_numbers = [i for i in raw_ids if "POL" in i.upper()]
-    order_numbers = [i for i in raw_ids if any(x in i.upper() for x in ["ORD", "TRK", "AWB"])]
+    case_ids, policy_numbers, order_numbers = {}, {}, {}
+    for raw_id in COMPILED_PATTERNS["id_number"].findall(text):
+        upper = raw_id.upper()
+        if "CASE" in upper or "REF" in upper:
+            case_ids[raw_id] = None
+        if "POL" in upper:
+            policy_numbers[raw_id] = None
+        if "ORD" in upper or "TRK" in upper or "AWB" in upper:
+            order_numbers[raw_id] = None
     
     return ExtractedIntelligence(
-        bankAccounts=list(set(bank_accounts)),
-        upiIds=list(set(upi_ids)),
-        phoneNumbers=list(set(phone_numbers)),
-        phishingLinks=list(set(phishing_links)),
-        suspiciousKeywords=list(set(keywords)),
-        emailAddresses=list(set(email_addresses)),
-        caseIds=list(set(case_ids)),
-        policyNumbers=list(set(policy_numbers)),
-        orderNumbers=list(set(order_numbers))
+        bankAccounts=list(bank_accounts),
+        upiIds=list(upi_ids),
+        phoneNumbers=list(phone_numbers),
+        phishingLinks=list(phishing_links),
+        suspiciousKeywords=keywords,
+        emailAddresses=list(email_addresses),
+        caseIds=list(case_ids),
+        policyNumbers=list(policy_numbers),
+        orderNumbers=list(order_numbers)
     )
 
 
-EXTRACTION_PROMPT = """Extract ALL scam-related intelligence from this conversation.
-
-CONVERSATION:
-{conversation}
-
-Look for:
+# What to look for (shared with the combined single-call prompt)
+EXTRACTION_GUIDE = """Look for:
 1. Bank account numbers (10-18 digit numbers that look like account numbers)
 2. UPI IDs (format: user@bank like abc@ybl, xyz@paytm, 123@okaxis)
 3. Phone numbers (Indian format: 10 digits starting with 6-9)
@@ -106,16 +157,166 @@ Look for:
 8. Insurance policy numbers
 9. Order or tracking numbers
 10. Banking details (IFSC codes, Branch names, Supervisor names)
-11. Payment details (VPA, UPI PINs mentioned in context)
+11. Payment details (VPA, UPI PINs mentioned in context)"""
+
+# Static instructions first, per-turn content last (shared prompt prefix).
+# Interleaved with known_intel and conversation by build_extraction_prompt.
+EXTRACTION_PROMPT_PARTS = (
+    """Extract ALL scam-related intelligence from the conversation below.
+
+""" + EXTRACTION_GUIDE + """
+
+Fill every list in the response schema, leaving lists empty when nothing new is found.
+Do NOT repeat anything listed under ALREADY EXTRACTED.
+
+ALREADY EXTRACTED:
+""",
+    """
+
+CONVERSATION:
+""",
+)
+
+
+def build_extraction_prompt(known_intel: str, conversation: str) -> str:
+    """Assemble the extraction prompt in a single join (no template parsing)."""
+    parts = EXTRACTION_PROMPT_PARTS
+    return "".join((parts[0], known_intel, parts[1], conversation))
+
+
+# Max characters of conversation sent to the LLM extractor (keeps the tail)
+LLM_CONTEXT_CHAR_LIMIT = 32 * 1024
+
+
+def compact_for_llm(lines: List[str]) -> str:
+    """
+    Shrink conversation lines before sending them to the LLM.
+    
+    Collapses runs of whitespace, drops repeated lines (scammers resend the
+    same boilerplate) and keeps only the last LLM_CONTEXT_CHAR_LIMIT chars.
+    Input tokens drive Gemini latency, so this is for the LLM prompt only;
+    regex extraction still sees the full text.
+    """
+    seen = set()
+    unique = []
+    for line in lines:
+        line = " ".join(line.split())
+        if line and line not in seen:
+            seen.add(line)
+            unique.append(line)
+    text = "\n".join(unique)
+    return text[-LLM_CONTEXT_CHAR_LIMIT:]
+
+
+# Short windows with no regex hits and none of these words are greetings or
+# small talk; the LLM has nothing to extract from them.
+LLM_MIN_CHARS = 200
+# Whole words only ("id" must not fire on "idea"), so inflections are listed
+LLM_TRIGGER_WORDS = (
+    "send", "sent", "sending", "pay", "paid", "payment", "transfer",
+    "transferred", "link", "links", "account", "accounts", "bank", "upi",
+    "card", "cards", "number", "numbers", "id", "ids", "email", "call",
+    "calling", "whatsapp", "sbi", "hdfc", "icici", "axis", "kotak", "paytm",
+    "phonepe", "gpay",
+)
+_LLM_TRIGGER_RE = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, LLM_TRIGGER_WORDS)) + r")\b", re.IGNORECASE
+)
+
+# Turns seen / LLM calls skipped by the gate above (logged for tuning)
+_llm_gate_stats = {"seen": 0, "skipped": 0}
+
+
+def needs_llm_extraction(text: str, regex_intel: ExtractedIntelligence) -> bool:
+    """Decide whether the LLM could find anything regex has not."""
+    return (
+        len(text) >= LLM_MIN_CHARS
+        or not regex_intel.is_empty()
+        or _LLM_TRIGGER_RE.search(text) is not None
+    )
+
+
+def regex_coverage_sufficient(latest_message: str, regex_intel: ExtractedIntelligence) -> bool:
+    """
+    Decide whether regex already found enough hard identifiers to skip the LLM.
+    
+    Once accounts/UPIs/phones are in hand the LLM rarely adds anything from a
+    short follow-up message, so its roundtrip is skipped for those turns.
+    Set LLM_SKIP_MIN_HARD_ITEMS=0 to disable.
+    """
+    threshold = settings.llm_skip_min_hard_items
+    if threshold <= 0 or len(latest_message) >= LLM_MIN_CHARS:
+        return False
+    score = len(regex_intel.bankAccounts) + len(regex_intel.upiIds) + len(regex_intel.phoneNumbers)
+    return score >= threshold
+
+
+def format_known_intelligence(intel: ExtractedIntelligence) -> str:
+    """Render regex findings for the extraction prompt so the LLM skips them."""
+    lines = [
+        f"- {name}: {', '.join(values)}"
+        for name, values in intel.to_dict().items()
+        if values
+    ]
+    return "\n".join(lines) if lines else "(nothing yet)"
+
+
+# Only new items are requested, so the lists stay short
+EXTRACTION_MAX_OUTPUT_TOKENS = 512
+
+
+class ExtractionSchema(BaseModel):
+    """Structured-output schema for the LLM extractor (mirrors ExtractedIntelligence)."""
+    bankAccounts: List[str]
+    upiIds: List[str]
+    phoneNumbers: List[str]
+    phishingLinks: List[str]
+    suspiciousKeywords: List[str]
+    emailAddresses: List[str]
+    caseIds: List[str]
+    policyNumbers: List[str]
+    orderNumbers: List[str]
+
+
+async def _extract_with_llm(prompt: str) -> ExtractedIntelligence:
+    """Run the LLM extraction prompt and wrap the JSON result."""
+    result = await generate_json_with_retry(
+        settings.llm_max_retries,
+        prompt=prompt,
+        model=settings.model_name,
+        thinking_level="minimal",  # Schema-constrained copying, no reasoning needed
+        response_schema=ExtractionSchema,
+        max_tokens=EXTRACTION_MAX_OUTPUT_TOKENS
+    )
+    return ExtractedIntelligence(
+        bankAccounts=result.get("bankAccounts", []),
+        upiIds=result.get("upiIds", []),
+        phoneNumbers=result.get("phoneNumbers", []),
+        phishingLinks=result.get("phishingLinks", []),
+        suspiciousKeywords=result.get("suspiciousKeywords", []),
+        emailAddresses=result.get("emailAddresses", []),
+        caseIds=result.get("caseIds", []),
+        policyNumbers=result.get("policyNumbers", []),
+        orderNumbers=result.get("orderNumbers", [])
+    )
 
-Respond with ONLY valid JSON (no markdown):
-{{"bankAccounts": [], "upiIds": [], "phoneNumbers": [], "phishingLinks": [], "suspiciousKeywords": [], "emailAddresses": [], "caseIds": [], "policyNumbers": [], "orderNumbers": []}}"""
+
+async def _regex_pass(
+    text: str,
+    prev_intel: Optional[ExtractedIntelligence]
+) -> ExtractedIntelligence:
+    """Regex-extract text off the event loop, merged into prev_intel if given."""
+    intel = await asyncio.to_thread(extract_with_regex, text)
+    return prev_intel.merge(intel) if prev_intel is not None else intel
 
 
 async def extract_intelligence(
     conversation_history: List[Dict],
     current_message: str = "",
-    use_llm: bool = True
+    use_llm: bool = True,
+    prev_intel: Optional[ExtractedIntelligence] = None,
+    scanned_count: int = 0,
+    recent_lines: Optional[Sequence[str]] = None
 ) -> ExtractedIntelligence:
     """
     Extract intelligence using both regex and LLM.
@@ -124,67 +325,80 @@ async def extract_intelligence(
         conversation_history: All messages in conversation
         current_message: Latest message
         use_llm: Whether to use LLM extraction (set False for regex-only to save costs)
+        prev_intel: Result of earlier turns; when given, regex only scans
+            messages from index scanned_count onwards and merges into it
+        scanned_count: Number of leading messages already covered by prev_intel
+        recent_lines: Pre-formatted "sender: text" lines of the latest
+            messages (the session keeps these); built from history if omitted
         
     Returns:
         ExtractedIntelligence with all findings
     """
-    # Limit context to last 6 messages to prevent context window bloat and timeouts
-    context_msgs = conversation_history[-6:]
+    # Method 1: Regex (fast, reliable, always runs)
+    # We run regex on all (new) history for safety, but LLM on window for speed.
+    new_messages = conversation_history[scanned_count:] if prev_intel is not None else conversation_history
+    regex_text = "\n".join(chain(
+        (m.get("text", "") for m in new_messages),
+        (current_message,) if current_message else ()
+    ))
     
-    all_text = []
-    for msg in context_msgs:
-        all_text.append(f"{msg.get('sender', 'user')}: {msg.get('text', '')}")
+    # Method 2: LLM (catches context-dependent info, only when requested)
+    if not use_llm:
+        logger.info("⏩ Skipping LLM extraction (regex-only this turn to save costs)")
+        return await _regex_pass(regex_text, prev_intel)
+    
+    # Limit context to the last few messages to prevent context window bloat and timeouts
+    if recent_lines is not None:
+        lines = list(recent_lines)
+    else:
+        context_msgs = conversation_history[-settings.llm_extraction_window:]
+        lines = [f"{msg.get('sender', 'user')}: {msg.get('text', '')}" for msg in context_msgs]
     if current_message:
-        all_text.append(f"scammer: {current_message}")
+        lines.append(f"scammer: {current_message}")
+    full_text = compact_for_llm(lines)
     
-    full_text = "\n".join(all_text)
+    # Tell the LLM what regex already found in its window so it only reports
+    # new items (shorter completion, fewer duplicates). The window is small,
+    # so this pass is cheap enough to run before the request goes out.
+    window_intel = extract_with_regex(full_text)
+    _llm_gate_stats["seen"] += 1
+    if not needs_llm_extraction(full_text, window_intel):
+        _llm_gate_stats["skipped"] += 1
+        logger.info("⏩ Skipping LLM extraction (trivial text; %d/%d turns skipped)",
+                    _llm_gate_stats["skipped"], _llm_gate_stats["seen"])
+        return await _regex_pass(regex_text, prev_intel)
     
-    # We also include currently known intelligence so the LLM knows what we already have
-    # and can focus on extracting NEW or updated info.
-    known_intel_str = ""
-    # We'll skip adding this here to keep it simple and avoid circularity issues
-    # but the regex will catch the global state from full history if needed.
+    latest_message = current_message or (conversation_history[-1].get("text", "") if conversation_history else "")
+    if regex_coverage_sufficient(latest_message, window_intel):
+        _llm_gate_stats["skipped"] += 1
+        logger.info("⏩ Skipping LLM extraction (regex coverage sufficient; %d/%d turns skipped)",
+                    _llm_gate_stats["skipped"], _llm_gate_stats["seen"])
+        return await _regex_pass(regex_text, prev_intel)
     
-    # Method 1: Regex (fast, reliable, always runs)
-    # We run regex on full history for safety, but LLM on window for speed.
-    full_history_text = "\n".join([m.get("text", "") for m in conversation_history] + [current_message])
-    regex_intel = extract_with_regex(full_history_text)
+    prompt = build_extraction_prompt(
+        known_intel=format_known_intelligence(window_intel),
+        conversation=full_text
+    )
     
-    # Method 2: LLM (catches context-dependent info, only when requested)
-    if not use_llm:
-        logger.info("⏩ Skipping LLM extraction (regex-only this turn to save costs)")
-        return regex_intel
+    # History regex runs in a worker thread while the LLM request is in flight
+    regex_intel, llm_result = await asyncio.gather(
+        _regex_pass(regex_text, prev_intel),
+        _extract_with_llm(prompt),
+        return_exceptions=True
+    )
+    if isinstance(regex_intel, BaseException):
+        raise regex_intel
     
-    try:
-        prompt = EXTRACTION_PROMPT.format(conversation=full_text)
-        result = await generate_json(
-            prompt=prompt,
-            model=settings.model_name,
-            thinking_level="low"
-        )
-        
-        llm_intel = ExtractedIntelligence(
-            bankAccounts=result.get("bankAccounts", []),
-            upiIds=result.get("upiIds", []),
-            phoneNumbers=result.get("phoneNumbers", []),
-            phishingLinks=result.get("phishingLinks", []),
-            suspiciousKeywords=result.get("suspiciousKeywords", []),
-            emailAddresses=result.get("emailAddresses", []),
-            caseIds=result.get("caseIds", []),
-            policyNumbers=result.get("policyNumbers", []),
-            orderNumbers=result.get("orderNumbers", [])
-        )
-        
-        # Merge both results
-        combined = regex_intel.merge(llm_intel)
-        
-    except Exception as e:
-        logger.error(f"LLM extraction error: {e}")
+    if isinstance(llm_result, BaseException):
+        logger.error("LLM extraction error: %s", llm_result)
         combined = regex_intel
+    else:
+        # Merge both results
+        combined = regex_intel.merge(llm_result)
     
-    logger.info(f"Extracted: {len(combined.bankAccounts)} accounts, "
-                f"{len(combined.upiIds)} UPIs, {len(combined.phoneNumbers)} phones, "
-                f"{len(combined.phishingLinks)} links")
+    logger.info("Extracted: %d accounts, %d UPIs, %d phones, %d links",
+                len(combined.bankAccounts), len(combined.upiIds),
+                len(combined.phoneNumbers), len(combined.phishingLinks))
     
     return combined
 
@@ -204,51 +418,65 @@ Include: scam type, tactics used, intelligence gathered.
 Be brief and factual. No JSON, just plain text summary."""
 
 
-async def generate_notes(
-    conversation_history: List[Dict],
-    intelligence: ExtractedIntelligence,
-    scam_type: str = "unknown"
+# Max length of agent notes sent in the callback
+NOTES_CHAR_LIMIT = 300
+
+# Tactic label -> keyword triggers, in report order
+KEYWORD_TACTICS = (
+    ("urgency pressure", frozenset({"urgent", "immediately"})),
+    ("OTP harvesting", frozenset({"otp"})),
+    ("account suspension threats", frozenset({"block", "suspend"})),
+    ("fake identity verification", frozenset({"verify"})),
+)
+
+
+@lru_cache(maxsize=1024)
+def _format_notes(
+    scam_type: str,
+    keywords: Tuple[str, ...],
+    phones: Tuple[str, ...],
+    accounts: Tuple[str, ...],
+    upis: Tuple[str, ...],
+    emails: Tuple[str, ...],
+    links: Tuple[str, ...]
 ) -> str:
-    """
-    Generate summary notes about the scam deterministically from extracted data.
-    No LLM call needed - faster, cheaper, and always accurate.
-    """
-    parts = []
-    
+    """Assemble the notes string (memoized: sessions re-report the same state)."""
     # Scam type
     scam_label = scam_type.replace("_", " ").title() if scam_type != "unknown" else "Suspected"
-    parts.append(f"{scam_label} scam detected.")
     
-    # Tactics
-    tactics = []
-    kw_str = " ".join(intelligence.suspiciousKeywords).lower()
-    if "urgent" in kw_str or "immediately" in kw_str:
-        tactics.append("urgency pressure")
-    if "otp" in kw_str:
-        tactics.append("OTP harvesting")
-    if "block" in kw_str or "suspend" in kw_str:
-        tactics.append("account suspension threats")
-    if "verify" in kw_str:
-        tactics.append("fake identity verification")
-    if intelligence.phishingLinks:
+    # Fast path: nothing extracted means no tactics or intel to report
+    if not (keywords or phones or accounts or upis or emails or links):
+        return f"{scam_label} scam detected. No specific contact intelligence extracted yet."
+    
+    parts = [f"{scam_label} scam detected."]
+    
+    # Tactics (exact keyword hits first; substring match catches LLM phrases
+    # such as "account blocked")
+    kw_set = frozenset(keywords)
+    kw_str = " ".join(keywords)
+    tactics = [
+        tactic for tactic, triggers in KEYWORD_TACTICS
+        if not kw_set.isdisjoint(triggers) or any(t in kw_str for t in triggers)
+    ]
+    if links:
         tactics.append("phishing links")
-    if intelligence.upiIds:
+    if upis:
         tactics.append("payment redirection")
     if tactics:
         parts.append(f"Tactics: {', '.join(tactics)}.")
     
     # Intelligence gathered
     intel_items = []
-    if intelligence.phoneNumbers:
-        intel_items.append(f"phone(s): {', '.join(intelligence.phoneNumbers)}")
-    if intelligence.bankAccounts:
-        intel_items.append(f"bank account(s): {', '.join(intelligence.bankAccounts)}")
-    if intelligence.upiIds:
-        intel_items.append(f"UPI ID(s): {', '.join(intelligence.upiIds)}")
-    if intelligence.emailAddresses:
-        intel_items.append(f"email(s): {', '.join(intelligence.emailAddresses)}")
-    if intelligence.phishingLinks:
-        intel_items.append(f"link(s): {', '.join(intelligence.phishingLinks)}")
+    if phones:
+        intel_items.append(f"phone(s): {', '.join(phones)}")
+    if accounts:
+        intel_items.append(f"bank account(s): {', '.join(accounts)}")
+    if upis:
+        intel_items.append(f"UPI ID(s): {', '.join(upis)}")
+    if emails:
+        intel_items.append(f"email(s): {', '.join(emails)}")
+    if links:
+        intel_items.append(f"link(s): {', '.join(links)}")
     
     if intel_items:
         parts.append(f"Intelligence gathered: {'; '.join(intel_items)}.")
@@ -256,7 +484,33 @@ async def generate_notes(
         parts.append("No specific contact intelligence extracted yet.")
     
     notes = " ".join(parts)
-    if len(notes) > 300:
-        notes = notes[:297] + "..."
+    if len(notes) > NOTES_CHAR_LIMIT:
+        notes = notes[:NOTES_CHAR_LIMIT - 3] + "..."
     
     return notes
+
+
+async def generate_notes(
+    conversation_history: List[Dict],
+    intelligence: ExtractedIntelligence,
+    scam_type: str = "unknown"
+) -> str:
+    """
+    Generate summary notes about the scam deterministically from extracted data.
+    No LLM call needed - faster, cheaper, and always accurate.
+    """
+    # Fast path: nothing extracted means no tactics or intel to report
+    if intelligence.is_empty():
+        return _format_notes(scam_type, (), (), (), (), (), ())
+    
+    # The lists are deduplicated and in first-seen order, so the same state
+    # gives the same cache key and the notes list items as they were found
+    return _format_notes(
+        scam_type,
+        tuple(dict.fromkeys(kw.lower() for kw in intelligence.suspiciousKeywords)),
+        tuple(intelligence.phoneNumbers),
+        tuple(intelligence.bankAccounts),
+        tuple(intelligence.upiIds),
+        tuple(intelligence.emailAddresses),
+        tuple(intelligence.phishingLinks)
+    )
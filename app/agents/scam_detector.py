@@ -4,16 +4,77 @@ Scam Detector
 Uses Gemini to analyze messages for scam/fraud indicators.
 """
 
+import re
+import asyncio
+import hashlib
 import logging
-from typing import List
+from typing import Any, Dict, List, Optional, Set
 from dataclasses import dataclass
 
+from pydantic import BaseModel
+
 from app.services.gemini import generate_json
+from app.services.cache import TTLCache
+from app.agents.intelligence_extractor import SCAM_KEYWORDS, extract_with_regex
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Templated scam messages repeat across sessions; reuse recent verdicts
+_detection_cache = TTLCache(
+    maxsize=settings.detection_cache_size,
+    ttl=settings.detection_cache_ttl
+)
+
+# Second tier keyed on the message template alone (numbers, links and
+# addresses masked): the same scam SMS reaches many sessions with different
+# amounts, phone numbers and links. Only confident scam verdicts are shared
+# this way, since benign verdicts depend more on the conversation.
+_template_cache = TTLCache(
+    maxsize=settings.detection_cache_size,
+    ttl=settings.detection_cache_ttl
+)
+TEMPLATE_MIN_CHARS = 40
+_TEMPLATE_MASK_RE = re.compile(r"https?://\S+|www\.\S+|\S+@\S+|\d+")
+
+# Keywords for the offline fallback verdict when Gemini is unavailable
+FALLBACK_KEYWORDS = ("urgent", "otp", "blocked", "verify", "bank", "upi", "kyc", "aadhar")
+
+# Any of these anywhere in the conversation sends it to Gemini; short
+# conversations with none of them are small talk (see _looks_benign)
+_SCAM_SIGNAL_WORDS = tuple(dict.fromkeys((*FALLBACK_KEYWORDS, *SCAM_KEYWORDS)))
+
+# Digits (OTPs, phones, accounts, amounts), "@" (UPI IDs, emails) and "/" or
+# ":" (links). bytes.translate deletes them in one C-level pass, so a length
+# change means the message has at least one.
+_SIGNAL_BYTES = b"0123456789@/:"
+
+# Pressure keywords that, together with payment/link details, settle a verdict
+_EXPLICIT_LINK_PREFIXES = ("http://", "https://", "www.")
+HIGH_CONFIDENCE_RE = re.compile(r"\b(otp|blocked|urgent|verify|kyc)\b", re.IGNORECASE)
+
+
+def _normalize_message(message: str) -> str:
+    """Lower-case and collapse whitespace, so trivial variants share cache keys."""
+    return " ".join(message.lower().split())
+
+
+def _detection_cache_key(message: str, conversation_history: str) -> bytes:
+    """Hash the normalized message plus the tail of the conversation context."""
+    return hashlib.blake2b(
+        (_normalize_message(message) + "\x00" + conversation_history[-500:]).encode(),
+        digest_size=16
+    ).digest()
+
+
+def _template_key(message: str) -> Optional[bytes]:
+    """Hash the message with variable parts masked, or None if too short to share."""
+    template = _TEMPLATE_MASK_RE.sub("#", _normalize_message(message))
+    if len(template) < TEMPLATE_MIN_CHARS:
+        return None
+    return hashlib.blake2b(template.encode(), digest_size=16).digest()
+
 
 @dataclass
 class ScamAnalysis:
@@ -24,9 +85,27 @@ class ScamAnalysis:
     indicators: List[str]
 
 
-DETECTION_PROMPT = """You are a scam detection expert. Analyze the following message for scam/fraud indicators.
+class DetectionSchema(BaseModel):
+    """Structured-output schema for one detection verdict."""
+    is_scam: bool
+    confidence: float
+    scam_type: str
+    indicators: List[str]
+
+
+class BatchDetectionSchema(DetectionSchema):
+    """Verdict for one numbered message of a batched prompt."""
+    id: int
+
+
+# A verdict is ~50 tokens of JSON. Classification needs no reasoning trace,
+# so thinking is kept minimal and decoding capped (per message in a batch).
+DETECTION_THINKING_LEVEL = "minimal"
+DETECTION_MAX_OUTPUT_TOKENS = 256
 
-COMMON SCAM INDICATORS:
+
+# Shared indicator/taxonomy block for single and batched detection prompts
+DETECTION_GUIDE = """COMMON SCAM INDICATORS:
 - Urgency tactics: "immediately", "urgent", "your account will be blocked"
 - Financial requests: OTP, bank details, UPI transfers, card numbers
 - Authority impersonation: claiming to be from bank, police, government
@@ -45,15 +124,213 @@ SCAM TYPES:
 - job_scam: Fake job offers
 - kyc_fraud: Fake KYC update requests
 - other: Other types
-- none: Not a scam
+- none: Not a scam"""
 
-MESSAGE TO ANALYZE:
-{message}
+# Static instructions come first and the message last, so consecutive
+# requests share the longest possible prompt prefix (provider prefix caching).
+# The prefixes are complete strings; per-request text is appended, not formatted in.
+DETECTION_PROMPT_PREFIX = """You are a scam detection expert. Analyze the following message for scam/fraud indicators.
 
-{history_context}
+""" + DETECTION_GUIDE + """
 
 Respond with ONLY valid JSON (no markdown, no explanation):
-{{"is_scam": true/false, "confidence": 0.0-1.0, "scam_type": "type", "indicators": ["list", "of", "indicators"]}}"""
+{"is_scam": true/false, "confidence": 0.0-1.0, "scam_type": "type", "indicators": ["list", "of", "indicators"]}
+
+MESSAGE TO ANALYZE:
+"""
+
+BATCH_DETECTION_PROMPT_PREFIX = """You are a scam detection expert. Analyze EACH of the following numbered messages independently for scam/fraud indicators.
+
+""" + DETECTION_GUIDE + """
+
+Respond with ONLY a valid JSON array (no markdown, no explanation), one object per message in the same order:
+[{"id": 1, "is_scam": true/false, "confidence": 0.0-1.0, "scam_type": "type", "indicators": ["list", "of", "indicators"]}]
+
+MESSAGES TO ANALYZE:
+"""
+
+
+class DetectionBatcher:
+    """
+    Micro-batches concurrent detection requests into one Gemini call.
+    
+    Requests are collected from a queue until max_batch_size is reached or
+    max_wait_ms has elapsed since the first one, then sent as a single
+    numbered multi-message prompt. The per-call overhead (network, TTFT) is
+    amortized across the batch. If the batched response cannot be matched
+    back to its requests, each request is retried individually.
+    """
+    
+    def __init__(self, max_batch_size: int = 8, max_wait_ms: int = 20):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Set[asyncio.Task] = set()
+    
+    async def submit(self, message: str, history_context: str) -> Dict[str, Any]:
+        """Queue a message for detection and wait for its raw JSON result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((message, history_context, future))
+        return await future
+    
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+    
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Dispatch without blocking collection of the next batch
+            task = self._loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _dispatch(self, batch: List[tuple]):
+        try:
+            if len(batch) == 1:
+                results = [await _detect_single(batch[0][0], batch[0][1])]
+            else:
+                results = await _detect_batch([(m, h) for m, h, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+async def _detect_single(message: str, history_context: str) -> Dict[str, Any]:
+    """Run the single-message detection prompt."""
+    prompt = "".join((DETECTION_PROMPT_PREFIX, message, "\n", history_context))
+    return await generate_json(
+        prompt=prompt,
+        model=settings.model_name,
+        temperature=0.1,  # Low temp for consistent detection
+        thinking_level=DETECTION_THINKING_LEVEL,
+        response_schema=DetectionSchema,
+        max_tokens=DETECTION_MAX_OUTPUT_TOKENS
+    )
+
+
+async def _detect_batch(items: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    Run the batched detection prompt, falling back to single calls when a
+    successful response does not match the batch.
+    
+    Raises:
+        Exception: If the Gemini call itself fails
+    """
+    messages = "\n\n".join(
+        f"{i}. MESSAGE:\n{message}{history_context}"
+        for i, (message, history_context) in enumerate(items, start=1)
+    )
+    result = await generate_json(
+        prompt=BATCH_DETECTION_PROMPT_PREFIX + messages,
+        model=settings.model_name,
+        temperature=0.1,
+        thinking_level=DETECTION_THINKING_LEVEL,
+        response_schema=list[BatchDetectionSchema],  # typing.List is not understood here
+        # Sized for the largest batch so the cached config is reused
+        max_tokens=DETECTION_MAX_OUTPUT_TOKENS * settings.detection_batch_size,
+        # API errors (429/503) propagate to every caller, which then use the
+        # keyword fallback, instead of multiplying into one call per message
+        raise_errors=True
+    )
+    
+    # Verdicts go to different sessions, so every id must appear exactly once
+    if (isinstance(result, list) and len(result) == len(items)
+            and all(isinstance(r, dict) for r in result)
+            and {r.get("id") for r in result} == set(range(1, len(items) + 1))):
+        return sorted(result, key=lambda r: r["id"])
+    
+    logger.warning("Batched detection returned mismatched output, retrying %d individually", len(items))
+    return list(await asyncio.gather(*(_detect_single(m, h) for m, h in items)))
+
+
+_batcher = DetectionBatcher(
+    max_batch_size=settings.detection_batch_size,
+    max_wait_ms=settings.detection_batch_window_ms
+)
+
+
+def _regex_prefilter(message: str) -> Optional[ScamAnalysis]:
+    """
+    Classify obvious scams without calling Gemini.
+    
+    Returns a high-confidence ScamAnalysis when the message both carries
+    payment/link details (UPI ID, phishing link or bank account) and uses a
+    pressure keyword, otherwise None. Only explicit links (http(s):// or
+    www.) count: the bare-domain pattern also matches "share it.Team" or
+    "3pm.see", and this verdict is never revisited.
+    """
+    keywords = sorted({kw.lower() for kw in HIGH_CONFIDENCE_RE.findall(message)})
+    if not keywords:
+        return None
+    
+    intel = extract_with_regex(message)
+    links = [link for link in intel.phishingLinks if link.lower().startswith(_EXPLICIT_LINK_PREFIXES)]
+    if intel.upiIds:
+        scam_type = "upi_fraud"
+    elif links:
+        scam_type = "phishing"
+    elif intel.bankAccounts:
+        scam_type = "bank_fraud"
+    else:
+        return None
+    
+    indicators = keywords.copy()
+    if intel.upiIds:
+        indicators.append("upi_id_shared")
+    if links:
+        indicators.append("suspicious_link")
+    if intel.bankAccounts:
+        indicators.append("bank_account_shared")
+    
+    return ScamAnalysis(
+        is_scam=True,
+        confidence=0.95,
+        scam_type=scam_type,
+        indicators=indicators
+    )
+
+
+def _looks_benign(message: str, conversation_history: str) -> bool:
+    """
+    True for a short message with no numbers, "@" or link characters, in a
+    conversation with no scam signal words.
+    
+    Such turns are answered without Gemini as a low-confidence non-scam.
+    The verdict is not cached, so detection runs again on the next turn
+    with more context. Plain substring checks: faster than an automaton or
+    alternation regex for a list this size (see extract_with_regex).
+    """
+    max_chars = settings.detection_benign_max_chars
+    if max_chars <= 0 or len(message) > max_chars:
+        return False
+    encoded = message.encode()
+    if len(encoded.translate(None, _SIGNAL_BYTES)) != len(encoded):
+        return False
+    text = f"{conversation_history}\n{message}".lower()
+    return not any(kw in text for kw in _SCAM_SIGNAL_WORDS)
 
 
 async def detect_scam(
@@ -74,22 +351,38 @@ async def detect_scam(
         ScamAnalysis: Object containing boolean is_scam, float confidence, 
                      string scam_type, and list of specific indicators.
     """
+    cache_key = _detection_cache_key(message, conversation_history)
+    cached = _detection_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Scam detection cache hit")
+        return cached
+    
+    template_key = _template_key(message)
+    if template_key is not None:
+        cached = _template_cache.get(template_key)
+        if cached is not None:
+            logger.info("Scam detection template cache hit")
+            return cached
+    
+    # Fast path: payment details or links plus pressure keywords need no LLM
+    prefiltered = _regex_prefilter(message)
+    if prefiltered is not None:
+        logger.info("Scam detection (regex pre-filter): type=%s", prefiltered.scam_type)
+        return prefiltered
+    
+    if _looks_benign(message, conversation_history):
+        logger.info("Scam detection skipped: short message, no scam signals")
+        return ScamAnalysis(is_scam=False, confidence=0.2, scam_type="none", indicators=[])
+    
     history_context = ""
     if conversation_history:
         history_context = f"\nCONVERSATION CONTEXT:\n{conversation_history}"
     
-    prompt = DETECTION_PROMPT.format(
-        message=message,
-        history_context=history_context
-    )
-    
     try:
-        result = await generate_json(
-            prompt=prompt,
-            model=settings.model_name,
-            temperature=0.1,  # Low temp for consistent detection
-            thinking_level="low"
-        )
+        if settings.detection_batch_size > 1:
+            result = await _batcher.submit(message, history_context)
+        else:
+            result = await _detect_single(message, history_context)
         
         analysis = ScamAnalysis(
             is_scam=result.get("is_scam", False),
@@ -98,16 +391,22 @@ async def detect_scam(
             indicators=result.get("indicators", [])
         )
         
-        logger.info(f"Scam detection: is_scam={analysis.is_scam}, "
-                   f"confidence={analysis.confidence:.2f}, type={analysis.scam_type}")
+        logger.info("Scam detection: is_scam=%s, confidence=%.2f, type=%s",
+                    analysis.is_scam, analysis.confidence, analysis.scam_type)
+        
+        if result:
+            _detection_cache.set(cache_key, analysis)
+            if (template_key is not None and analysis.is_scam
+                    and analysis.confidence >= settings.detection_template_min_confidence):
+                _template_cache.set(template_key, analysis)
         
         return analysis
         
     except Exception as e:
-        logger.error(f"Detection error: {e}")
+        logger.error("Detection error: %s", e)
         # Fallback: keyword-based detection
-        scam_keywords = ["urgent", "otp", "blocked", "verify", "bank", "upi", "kyc", "aadhar"]
-        is_likely_scam = any(kw in message.lower() for kw in scam_keywords)
+        message_lower = message.lower()
+        is_likely_scam = any(kw in message_lower for kw in FALLBACK_KEYWORDS)
         
         return ScamAnalysis(
             is_scam=is_likely_scam,
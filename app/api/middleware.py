@@ -8,6 +8,7 @@ from fastapi import Request, HTTPException
 from fastapi.security import APIKeyHeader
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+import hmac
 import logging
 
 from app.config import settings
@@ -17,12 +18,15 @@ logger = logging.getLogger(__name__)
 # API Key header scheme
 api_key_header = APIKeyHeader(name="x-api-key", auto_error=False)
 
+# Expected key, encoded once for compare_digest
+API_KEY_BYTES = settings.api_key.encode()
 
-async def verify_api_key(api_key: str = None) -> bool:
-    """Verify the provided API key."""
+
+def verify_api_key(api_key: str = None) -> bool:
+    """Verify the provided API key (constant-time compare)."""
     if not api_key:
         return False
-    return api_key == settings.api_key
+    return hmac.compare_digest(api_key.encode(), API_KEY_BYTES)
 
 
 class APIKeyMiddleware(BaseHTTPMiddleware):
@@ -45,19 +49,21 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
         "/openapi.json",
         "/favicon.ico"
     }
+    # Documentation sub-pages (e.g. /docs/oauth2-redirect)
+    EXEMPT_PREFIXES = ("/docs/", "/redoc/")
     
     async def dispatch(self, request: Request, call_next):
         path = request.url.path
         
         # Allow exempt paths
-        if path in self.EXEMPT_PATHS:
+        if path in self.EXEMPT_PATHS or path.startswith(self.EXEMPT_PREFIXES):
             return await call_next(request)
         
         # Check API key
         api_key = request.headers.get("x-api-key")
         
         if not api_key:
-            logger.warning(f"Missing API key for request to {path}")
+            logger.warning("Missing API key for request to %s", path)
             return JSONResponse(
                 status_code=401,
                 content={
@@ -66,8 +72,8 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
                 }
             )
         
-        if not await verify_api_key(api_key):
-            logger.warning(f"Invalid API key for request to {path}")
+        if not verify_api_key(api_key):
+            logger.warning("Invalid API key for request to %s", path)
             return JSONResponse(
                 status_code=403,
                 content={
@@ -92,7 +98,7 @@ def get_api_key_dependency(api_key: str = None):
     """
     async def verify(request: Request):
         api_key = request.headers.get("x-api-key")
-        if not api_key or not await verify_api_key(api_key):
+        if not api_key or not verify_api_key(api_key):
             raise HTTPException(
                 status_code=403,
                 detail="Invalid or missing API key"
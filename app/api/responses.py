@@ -0,0 +1,23 @@
+"""
+API Response Classes
+
+JSON responses rendered with orjson.
+"""
+
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse serialized with orjson.
+    
+    Equivalent to fastapi.responses.ORJSONResponse, which newer FastAPI
+    releases deprecate in favour of response models; our endpoints return
+    plain dicts, so we keep our own.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -5,29 +5,272 @@ Main honeypot API endpoints using simplified Gemini-based agents.
 """
 
 import logging
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.security import APIKeyHeader
 import asyncio
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
+from pydantic import ValidationError
 
 from app.config import get_settings
-from app.models.request import HoneypotRequest
+from app.api.responses import ORJSONResponse
+from app.models.request import HoneypotRequest, request_body_schema
 from app.models.response import HoneypotResponse, EngagementMetrics, ErrorResponse
 from app.models.intelligence import ExtractedIntelligence as IntelligenceModel
-from app.services.session import session_store
-from app.agents.scam_detector import detect_scam
-from app.agents.honeypot_persona import generate_response, get_fallback_response
+from app.services.session import ConversationSession, session_store
+from app.services.semantic_cache import semantic_cache
+from app.services.callback_dispatcher import callback_dispatcher
+from app.agents.scam_detector import ScamAnalysis, detect_scam
+from app.agents.honeypot_persona import (
+    forget_conversation_tail,
+    generate_response,
+    get_fallback_response,
+    is_fallback_response,
+    select_persona_for_session,
+    summarize_history,
+    summary_due,
+)
 from app.agents.intelligence_extractor import extract_intelligence, generate_notes, extract_with_regex
+from app.agents.combined import analyze_combined
 from app.tools.callback import send_guvi_callback
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-router = APIRouter()
+# Reported by /health
+MODEL_NAME = settings.model_name
+
+# Endpoints return plain dicts; orjson serializes them much faster than the stdlib encoder
+router = APIRouter(default_response_class=ORJSONResponse)
 api_key_header = APIKeyHeader(name="x-api-key")
 
 
+# Bodies at least this large (long conversationHistory) are validated in a
+# worker thread instead of on the event loop
+REQUEST_OFFLOAD_BYTES = 64 * 1024
+
+# Served when a session has no intelligence yet (only ever serialized)
+EMPTY_INTELLIGENCE = IntelligenceModel().to_dict()
+
+
+async def parse_honeypot_request(raw: Request) -> HoneypotRequest:
+    """
+    Validate the /analyze body straight from JSON bytes.
+    
+    Replaces FastAPI's own body handling (json.loads, then validation, all
+    on the event loop) so that large payloads can be validated off-loop.
+    Invalid bodies still get FastAPI's usual 422 response.
+    """
+    body = await raw.body()
+    try:
+        if len(body) >= REQUEST_OFFLOAD_BYTES:
+            return await asyncio.to_thread(HoneypotRequest.model_validate_json, body)
+        return HoneypotRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)],
+            body=body
+        )
+
+
+def _llm_extraction_worthwhile(session: ConversationSession) -> bool:
+    """
+    Whether LLM extraction is worth its call this turn.
+    
+    This turn's detection runs alongside extraction, so the decision uses the
+    previous turn's verdict: sessions judged benign with low confidence get
+    regex-only extraction until a later verdict says otherwise. Before any
+    verdict (scam_type still "unknown") the LLM is used.
+    """
+    return (
+        session.scam_detected
+        or session.scam_type == "unknown"
+        or session.confidence_level >= settings.extraction_min_confidence
+    )
+
+
+async def _pipeline_turn(session: ConversationSession, request: HoneypotRequest) -> Tuple[str, IntelligenceModel]:
+    """
+    Detect, reply and extract with separate (concurrent) Gemini calls.
+    
+    Returns:
+        (agent reply, intelligence to merge into the session)
+    """
+    session_id = session.session_id
+    
+    # Conversation text for analysis (kept up to date by add_message)
+    conversation_text = session.transcript
+    
+    # Step 1: Detect scam intent using Gemini (Only if not already detected to save credits)
+    # Neither the persona reply nor extraction reads the detection result,
+    # so it runs alongside them instead of before them.
+    detection_task = None
+    if not session.scam_detected:
+        logger.info("[%s] 🔍 Analyzing for scam intent...", session_id)
+        detection_task = detect_scam(
+            message=request.message.text,
+            conversation_history=conversation_text
+        )
+    else:
+        logger.info("[%s] ⏩ Skipping scam detection (Already flagged as scam)", session_id)
+    
+    # Step 2 & 3: Parallelize Response Generation and Intelligence Extraction
+    # This reduces turnaround time by approx 50%
+    logger.info("[%s] ⚡ Generating response and extracting intelligence in parallel...", session_id)
+    
+    try:
+        # We run both in parallel. If extraction fails (rate limit), we still want the response.
+        # Regex only needs the messages added since the last turn
+        extraction_task = extract_intelligence(
+            conversation_history=session.messages,
+            current_message="",
+            use_llm=_llm_extraction_worthwhile(session),
+            prev_intel=session.intelligence,
+            scanned_count=session.intel_scanned_count,
+            recent_lines=session.recent_lines
+        )
+        scanned_count = session.message_count
+        response_task = generate_response(
+            message=request.message.text,
+            conversation_history=session.messages,
+            persona_type=session.persona_type,
+            session_id=session_id,
+            summary=session.summary,
+            up_to=session.message_count - 1  # Everything but the current message
+        )
+        
+        # Execute and gather
+        tasks = [response_task, extraction_task]
+        if detection_task is not None:
+            tasks.append(detection_task)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Handle detection result (detect_scam falls back to keywords internally)
+        if detection_task is not None:
+            scam_analysis = results[2]
+            if isinstance(scam_analysis, Exception):
+                logger.error("[%s] Scam detection failed: %s", session_id, scam_analysis)
+            else:
+                session.scam_detected = scam_analysis.is_scam
+                session.scam_type = scam_analysis.scam_type
+                session.confidence_level = scam_analysis.confidence
+                
+                logger.info("[%s] ✅ Scam: %s (confidence: %.2f, type: %s)", session_id,
+                            scam_analysis.is_scam, scam_analysis.confidence, scam_analysis.scam_type)
+        
+        # Handle response result
+        if isinstance(results[0], Exception):
+            logger.error("[%s] Response generation failed: %s", session_id, results[0])
+            agent_response = get_fallback_response(request.message.text)
+        else:
+            agent_response = results[0]
+            
+        # Handle extraction result
+        if isinstance(results[1], Exception):
+            logger.warning("[%s] LLM extraction failed (likely rate limit). Falling back to Regex.", session_id)
+            # Fallback to regex on full history
+            full_history = "\n".join(m.get("text", "") for m in session.messages)
+            intelligence = extract_with_regex(full_history)
+        else:
+            intelligence = results[1]
+            session.intel_scanned_count = scanned_count
+            
+    except Exception as e:
+        logger.error("[%s] Parallel execution error: %s", session_id, e)
+        agent_response = get_fallback_response(request.message.text)
+        intelligence = extract_with_regex("\n".join(m.get("text", "") for m in session.messages))
+    
+    return agent_response, intelligence
+
+
+async def _combined_turn(session: ConversationSession, request: HoneypotRequest) -> Optional[Tuple[str, IntelligenceModel]]:
+    """
+    Detect, reply and extract with a single Gemini call (COMBINED_ANALYSIS).
+    
+    Regex extraction of the new messages runs alongside the call.
+    
+    Returns:
+        (agent reply, intelligence to merge into the session), or None if
+        the combined call failed and the separate calls should be used
+    """
+    session_id = session.session_id
+    logger.info("[%s] ⚡ Running combined detection/response/extraction call...", session_id)
+    
+    scanned_count = session.message_count
+    combined, regex_intel = await asyncio.gather(
+        analyze_combined(
+            message=request.message.text,
+            conversation_history=session.messages,
+            persona_type=session.persona_type,
+            session_id=session_id,
+            summary=session.summary,
+            up_to=session.message_count - 1  # Everything but the current message
+        ),
+        extract_intelligence(
+            conversation_history=session.messages,
+            use_llm=False,
+            prev_intel=session.intelligence,
+            scanned_count=session.intel_scanned_count
+        ),
+        return_exceptions=True
+    )
+    if isinstance(combined, Exception) or isinstance(regex_intel, Exception):
+        error = combined if isinstance(combined, Exception) else regex_intel
+        logger.warning("[%s] Combined analysis failed (%s). Falling back to separate calls.", session_id, error)
+        return None
+    
+    if not session.scam_detected:
+        scam_analysis = combined.scam
+        session.scam_detected = scam_analysis.is_scam
+        session.scam_type = scam_analysis.scam_type
+        session.confidence_level = scam_analysis.confidence
+        logger.info("[%s] ✅ Scam: %s (confidence: %.2f, type: %s)", session_id,
+                    scam_analysis.is_scam, scam_analysis.confidence, scam_analysis.scam_type)
+    
+    session.intel_scanned_count = scanned_count
+    return combined.reply, regex_intel.merge(combined.intelligence)
+
+
+async def _cached_turn(
+    session: ConversationSession,
+    request: HoneypotRequest,
+    cached: Tuple[str, ScamAnalysis]
+) -> Optional[Tuple[str, IntelligenceModel]]:
+    """
+    Reuse the verdict and reply cached for a near-duplicate opening message.
+    
+    Intelligence is still extracted from this message (cached messages
+    carry other scammers' numbers and links).
+    
+    Returns:
+        (agent reply, intelligence to merge into the session), or None if
+        extraction failed and the full pipeline should run instead
+    """
+    session_id = session.session_id
+    reply, scam_analysis = cached
+    logger.info("[%s] ⏩ Semantic cache hit: reusing verdict and reply", session_id)
+    
+    scanned_count = session.message_count
+    try:
+        intelligence = await extract_intelligence(
+            conversation_history=session.messages,
+            use_llm=True,
+            prev_intel=session.intelligence,
+            scanned_count=session.intel_scanned_count,
+            recent_lines=session.recent_lines
+        )
+    except Exception as e:
+        logger.warning("[%s] Extraction failed on semantic cache hit (%s). Running full pipeline.", session_id, e)
+        return None
+    
+    session.scam_detected = scam_analysis.is_scam
+    session.scam_type = scam_analysis.scam_type
+    session.confidence_level = scam_analysis.confidence
+    session.intel_scanned_count = scanned_count
+    return reply, intelligence
+
+
 @router.post(
     "/analyze",
     responses={
@@ -35,6 +278,11 @@ api_key_header = APIKeyHeader(name="x-api-key")
         400: {"model": ErrorResponse, "description": "Invalid request"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     },
+    # The body is parsed by parse_honeypot_request, so document it here
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": request_body_schema()}}
+    }},
     summary="Analyze message and generate honeypot response",
     description="""
     Main honeypot endpoint. Accepts scam messages and:
@@ -45,166 +293,155 @@ api_key_header = APIKeyHeader(name="x-api-key")
     """
 )
 async def analyze_message(
-    request: HoneypotRequest,
-    background_tasks: BackgroundTasks,
+    request: HoneypotRequest = Depends(parse_honeypot_request),
     api_key: str = Depends(api_key_header)
 ):
     """
     Process an incoming scam message through the honeypot pipeline.
     """
     session_id = request.sessionId
-    logger.info(f"[{session_id}] 📨 Received message from {request.message.sender}")
+    logger.info("[%s] 📨 Received message from %s", session_id, request.message.sender)
     
     try:
-        # Get or create session
-        session = session_store.get_or_create(session_id)
-        
-        # Add conversation history if provided (for new sessions)
-        if request.conversationHistory and session.message_count == 0:
-            for msg in request.conversationHistory:
-                session.add_message(
-                    sender=msg.sender,
-                    text=msg.text,
-                    timestamp=msg.timestamp
-                )
-        
-        # Add current message
-        session.add_message(
-            sender=request.message.sender,
-            text=request.message.text,
-            timestamp=request.message.timestamp
-        )
-        
-        # Build conversation text for analysis
-        conversation_text = "\n".join([
-            f"{m['sender'].upper()}: {m['text']}"
-            for m in session.messages
-        ])
-        
-        # Step 1: Detect scam intent using Gemini (Only if not already detected to save credits)
-        if not session.scam_detected:
-            logger.info(f"[{session_id}] 🔍 Analyzing for scam intent...")
-            scam_analysis = await detect_scam(
-                message=request.message.text,
-                conversation_history=conversation_text
-            )
+        # Requests for one session are handled one at a time so concurrent
+        # turns cannot interleave their reads and writes of the session
+        async with session_store.lock(session_id):
+            # Get or create session
+            session = session_store.get_or_create(session_id)
             
-            session.scam_detected = scam_analysis.is_scam
-            session.scam_type = scam_analysis.scam_type
-            session.confidence_level = scam_analysis.confidence
+            # Add conversation history if provided (for new sessions)
+            if request.conversationHistory and session.message_count == 0:
+                for msg in request.conversationHistory:
+                    session.add_message(
+                        sender=msg.sender,
+                        text=msg.text,
+                        timestamp=msg.timestamp
+                    )
             
-            logger.info(f"[{session_id}] ✅ Scam: {scam_analysis.is_scam} "
-                       f"(confidence: {scam_analysis.confidence:.2f}, type: {scam_analysis.scam_type})")
-        else:
-            logger.info(f"[{session_id}] ⏩ Skipping scam detection (Already flagged as scam)")
-        
-        # Step 2 & 3: Parallelize Response Generation and Intelligence Extraction
-        # This reduces turnaround time by approx 50%
-        logger.info(f"[{session_id}] ⚡ Generating response and extracting intelligence in parallel...")
-        
-        try:
-            # We run both in parallel. If extraction fails (rate limit), we still want the response.
-            extraction_task = extract_intelligence(
-                conversation_history=session.messages,
-                current_message="",
-                use_llm=True
-            )
-            response_task = generate_response(
-                message=request.message.text,
-                conversation_history=session.messages[:-1],
-                persona_type=session.persona_type,
-                session_id=session_id
+            # Add current message
+            session.add_message(
+                sender=request.message.sender,
+                text=request.message.text,
+                timestamp=request.message.timestamp
             )
             
-            # Execute and gather
-            results = await asyncio.gather(response_task, extraction_task, return_exceptions=True)
+            # Fold messages about to leave the prompt window into the running
+            # summary; runs alongside this turn and is used from the next one
+            summary_task = None
+            if summary_due(session.message_count, session.summary_upto_idx):
+                summary_upto_idx = session.message_count
+                summary_task = asyncio.create_task(summarize_history(
+                    session.summary, session.messages[session.summary_upto_idx:summary_upto_idx]
+                ))
             
-            # Handle response result
-            if isinstance(results[0], Exception):
-                logger.error(f"[{session_id}] Response generation failed: {results[0]}")
-                agent_response = get_fallback_response(request.message.text)
-            else:
-                agent_response = results[0]
-                
-            # Handle extraction result
-            if isinstance(results[1], Exception):
-                logger.warning(f"[{session_id}] LLM extraction failed (likely rate limit). Falling back to Regex.")
-                # Fallback to regex on full history
-                full_history = "\n".join([m.get("text", "") for m in session.messages])
-                intelligence = extract_with_regex(full_history)
-            else:
-                intelligence = results[1]
-                
-        except Exception as e:
-            logger.error(f"[{session_id}] Parallel execution error: {e}")
-            agent_response = get_fallback_response(request.message.text)
-            intelligence = extract_with_regex("\n".join([m.get("text", "") for m in session.messages]))
-
-        # Add agent response to session
-        session.add_message(
-            sender="user",
-            text=agent_response
-        )
-        
-        # Merge intelligence into session
-        if session.intelligence:
-            session.intelligence = session.intelligence.merge(intelligence)
-        else:
-            session.intelligence = intelligence
-        
-        # Step 4: Generate agent notes (deterministic, no LLM call - run every turn)
-        if session.scam_detected:
-            session.agent_notes = await generate_notes(
-                conversation_history=session.messages,
-                intelligence=session.intelligence or intelligence,
-                scam_type=session.scam_type
-            )
-        
-        # Step 5: Send GUVI callback on EVERY turn after scam detection
-        # The evaluator uses the latest callback data for scoring
-        if session.scam_detected:
-            logger.info(f"[{session_id}] 📤 Sending GUVI callback (turn {session.message_count})...")
-            background_tasks.add_task(
-                send_guvi_callback,
-                session_id=session_id,
-                scam_detected=session.scam_detected,
-                total_messages=session.message_count,
-                intelligence=session.intelligence,
-                agent_notes=session.agent_notes or "Scam engagement in progress",
-                engagement_duration_seconds=session.duration_seconds,
-                scam_type=session.scam_type,
-                confidence_level=session.confidence_level or 0.95
+            # Opening messages are often templated: reuse the verdict and
+            # reply of a near-duplicate opener (same persona) when cached
+            turn = None
+            cache_embedding = cache_namespace = None
+            if semantic_cache.ready and session.message_count == 1:
+                cache_namespace = select_persona_for_session(session_id, session.persona_type)["name"]
+                try:
+                    cache_embedding, cached = await semantic_cache.lookup(request.message.text, cache_namespace)
+                except Exception as e:
+                    logger.warning("[%s] Semantic cache lookup failed: %s", session_id, e)
+                    cached = None
+                if cached is not None:
+                    cache_embedding = None  # Already cached
+                    turn = await _cached_turn(session, request, cached)
+            
+            if turn is None and settings.combined_analysis:
+                turn = await _combined_turn(session, request)
+            if turn is None:
+                turn = await _pipeline_turn(session, request)
+            agent_response, intelligence = turn
+            
+            # Cache only real verdicts and generated replies
+            if (cache_embedding is not None and session.scam_type != "unknown"
+                    and not is_fallback_response(agent_response)):
+                semantic_cache.add(cache_embedding, cache_namespace, (agent_response, ScamAnalysis(
+                    is_scam=session.scam_detected,
+                    confidence=session.confidence_level,
+                    scam_type=session.scam_type,
+                    indicators=[]
+                )))
+            
+            if summary_task is not None:
+                try:
+                    session.summary = await summary_task
+                    session.summary_upto_idx = summary_upto_idx
+                except Exception as e:
+                    logger.warning("[%s] History summary failed: %s", session_id, e)
+            
+            # Add agent response to session
+            session.add_message(
+                sender="user",
+                text=agent_response
             )
-            session.callback_sent = True
-        
-        # Update session
-        session_store.update(session)
-        
-        logger.info(f"[{session_id}] 🎯 Response generated. Messages: {session.message_count}")
-        
-        # Return base response PLUS all scoring fields for maximum 'Response Structure' points
-        # We include both flat and nested structures to ensure compliance with all evaluator types
-        return {
-            "status": "success",
-            "reply": agent_response,
-            "message": agent_response,  # Compatibility alias
-            "text": agent_response,     # Compatibility alias
-            "sessionId": session_id,
-            "scamDetected": session.scam_detected,
-            "extractedIntelligence": session.intelligence.to_dict() if session.intelligence else IntelligenceModel().to_dict(),
-            "totalMessagesExchanged": session.message_count,
-            "engagementDurationSeconds": session.duration_seconds,
-            "agentNotes": session.agent_notes or "Scam engagement in progress",
-            "scamType": session.scam_type,
-            "confidenceLevel": session.confidence_level or 0.95,
-            "engagementMetrics": {
-                "engagementDurationSeconds": session.duration_seconds,
-                "totalMessagesExchanged": session.message_count
-            }
-        }
+            
+            # Merge intelligence into session
+            if session.intelligence:
+                session.intelligence = session.intelligence.merge(intelligence)
+            else:
+                session.intelligence = intelligence
+            
+            # Step 4: Generate agent notes (deterministic, no LLM call - run every turn)
+            if session.scam_detected:
+                session.agent_notes = await generate_notes(
+                    conversation_history=session.messages,
+                    intelligence=session.intelligence or intelligence,
+                    scam_type=session.scam_type
+                )
+            
+            # Read once; the callback, log line and response all report them
+            message_count = session.message_count
+            duration = session.duration_seconds
+            
+            # Step 5: Send GUVI callback on EVERY turn after scam detection
+            # The evaluator uses the latest callback data for scoring, so the
+            # dispatcher only sends the newest payload of back-to-back turns
+            if session.scam_detected:
+                logger.info("[%s] 📤 Queueing GUVI callback (turn %d)...", session_id, message_count)
+                callback_dispatcher.submit(
+                    session_id=session_id,
+                    scam_detected=session.scam_detected,
+                    total_messages=message_count,
+                    intelligence=session.intelligence,
+                    agent_notes=session.agent_notes or "Scam engagement in progress",
+                    engagement_duration_seconds=duration,
+                    scam_type=session.scam_type,
+                    confidence_level=session.confidence_level or 0.95
+                )
+                session.callback_sent = True
+            
+            # Update session
+            session_store.update(session)
+            
+            logger.info("[%s] 🎯 Response generated. Messages: %d", session_id, message_count)
+            
+            # Return base response PLUS all scoring fields for maximum 'Response Structure' points
+            # We include both flat and nested structures to ensure compliance with all evaluator types
+            # (returned as a response object so FastAPI skips jsonable_encoder on this hot path)
+            return ORJSONResponse({
+                "status": "success",
+                "reply": agent_response,
+                "message": agent_response,  # Compatibility alias
+                "text": agent_response,     # Compatibility alias
+                "sessionId": session_id,
+                "scamDetected": session.scam_detected,
+                "extractedIntelligence": session.intelligence.to_dict() if session.intelligence else EMPTY_INTELLIGENCE,
+                "totalMessagesExchanged": message_count,
+                "engagementDurationSeconds": duration,
+                "agentNotes": session.agent_notes or "Scam engagement in progress",
+                "scamType": session.scam_type,
+                "confidenceLevel": session.confidence_level or 0.95,
+                "engagementMetrics": {
+                    "engagementDurationSeconds": duration,
+                    "totalMessagesExchanged": message_count
+                }
+            })
         
     except Exception as e:
-        logger.error(f"[{session_id}] ❌ Error processing message: {e}", exc_info=True)
+        logger.exception("[%s] ❌ Error processing message: %s", session_id, e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing message: {str(e)}"
@@ -256,8 +493,11 @@ async def end_session(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    # A callback still waiting in the dispatcher goes out now
+    callback_result = await callback_dispatcher.flush(session_id)
+    
     # Send callback if not already sent
-    if session.scam_detected and not session.callback_sent:
+    if callback_result is None and session.scam_detected and not session.callback_sent:
         callback_result = await send_guvi_callback(
             session_id=session_id,
             scam_detected=session.scam_detected,
@@ -268,10 +508,12 @@ async def end_session(
             scam_type=session.scam_type,
             confidence_level=0.95
         )
+    if callback_result is not None:
         session.callback_sent = callback_result["status"] == "success"
     
-    # Delete session
+    # Delete session (and its cached prompt tail, in case the id is reused)
     session_store.delete(session_id)
+    forget_conversation_tail(session_id)
     
     return {
         "status": "success",
@@ -320,5 +562,5 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "model": settings.model_name
+        "model": MODEL_NAME
     }
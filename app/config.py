@@ -6,7 +6,7 @@ Loads environment variables and provides centralized configuration.
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
-from typing import Optional
+from typing import List, Optional
 from functools import lru_cache
 
 
@@ -20,16 +20,77 @@ class Settings(BaseSettings):
     # Google Gemini Configuration
     google_api_key: str = Field(default="", description="Gemini API key")
     model_name: str = Field(default="gemini-3-flash-preview")
+    gemini_max_concurrency: int = Field(default=50, description="Max in-flight Gemini requests per process")
+    gemini_warmup: bool = Field(default=True, description="Send one tiny Gemini request at startup")
     
     # GUVI Callback
     guvi_callback_url: str = Field(
         default="https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
     )
+    # Per-turn callbacks for a session are coalesced over this window (ms)
+    callback_debounce_ms: int = Field(default=250)
     
     # Agent Configuration
     max_conversation_turns: int = Field(default=20)
     min_turns_for_callback: int = Field(default=5)
     agent_temperature: float = Field(default=1.0)
+    agent_max_output_tokens: int = Field(
+        default=1024,
+        description="Output cap for persona replies (thinking tokens count against it)"
+    )
+    
+    # Regex-only extraction while an earlier turn's verdict is non-scam below
+    # this confidence (0 = always use the LLM)
+    extraction_min_confidence: float = Field(default=0.4)
+    
+    # Summarize turns older than the persona prompt window once a conversation
+    # has this many messages (0 disables)
+    history_summary_after: int = Field(default=12)
+    
+    # Detect, reply and extract with one Gemini call per turn instead of three
+    # (falls back to the separate calls if the combined call fails)
+    combined_analysis: bool = Field(default=False)
+    
+    # Messages up to this long with no scam keywords in the conversation skip
+    # Gemini detection (0 disables)
+    detection_benign_max_chars: int = Field(default=80)
+    
+    # LLM Result Caching
+    detection_cache_size: int = Field(default=10000)
+    detection_cache_ttl: int = Field(default=3600)
+    detection_template_min_confidence: float = Field(
+        default=0.85,
+        description="Min confidence for a scam verdict to be reused for same-template messages"
+    )
+    # Reply cache: only active when agent_temperature <= 0.5 (off by default)
+    response_cache_size: int = Field(default=2048)
+    response_cache_ttl: int = Field(default=600)
+    
+    # Semantic cache of verdict + reply for near-duplicate opening messages
+    # (needs sentence-transformers)
+    semantic_cache_enabled: bool = Field(default=False)
+    semantic_cache_model: str = Field(default="sentence-transformers/all-MiniLM-L6-v2")
+    semantic_cache_threshold: float = Field(default=0.92, description="Min cosine similarity for a hit")
+    semantic_cache_size: int = Field(default=2048, description="Entries kept per persona")
+    
+    # Scam Detection Micro-Batching (batch size <= 1 disables batching)
+    detection_batch_size: int = Field(default=8)
+    detection_batch_window_ms: int = Field(default=20)
+    
+    # LLM Extraction Retries
+    llm_max_retries: int = Field(default=3, description="Retries for rate-limited/unavailable Gemini calls")
+    
+    # Most recent messages shown to the LLM extractor
+    llm_extraction_window: int = Field(default=6)
+    
+    # Skip LLM extraction once regex has this many accounts/UPIs/phones (0 = never skip)
+    llm_skip_min_hard_items: int = Field(default=2)
+    
+    # Link hosts (and their subdomains) never reported as phishing
+    safe_link_domains: List[str] = Field(default=["google.com", "microsoft.com", "apple.com"])
+    
+    # Regex engine for extraction: "re" (stdlib) or "re2" (needs google-re2)
+    regex_backend: str = Field(default="re")
     
     # Session Storage
     redis_url: Optional[str] = Field(default=None)
@@ -45,7 +106,7 @@ class Settings(BaseSettings):
     )
 
 
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """Get cached settings instance."""
     return Settings()
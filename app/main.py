@@ -5,6 +5,7 @@ FastAPI application for the Agentic Honey-Pot system.
 Uses Google Gemini API (google-genai SDK) for AI capabilities.
 """
 
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
@@ -17,6 +18,7 @@ load_dotenv()
 
 from app.config import get_settings
 from app.api.routes import router
+from app.api.responses import ORJSONResponse
 from app.api.middleware import APIKeyMiddleware
 
 settings = get_settings()
@@ -54,18 +56,32 @@ async def lifespan(app: FastAPI):
     else:
         # Test Gemini connection
         try:
-            from google import genai
-            client = genai.Client()
-            # Minimal health check to the model
+            from app.services.gemini import get_client, warm_up
+            get_client()
             logger.info("✅ Gemini client initialized successfully")
+            if settings.gemini_warmup and await warm_up(settings.model_name):
+                logger.info("✅ Gemini connection warmed up")
         except Exception as e:
             logger.error(f"❌ Gemini client error: {e}")
             logger.error("This usually means GOOGLE_API_KEY is invalid or restricted.")
     
+    # Load the semantic cache's embedding model (no-op unless enabled)
+    from app.services.semantic_cache import semantic_cache
+    try:
+        await asyncio.to_thread(semantic_cache.load)
+    except Exception as e:
+        logger.error(f"❌ Semantic cache model failed to load, cache disabled: {e}")
+    
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down Honeypot API...")
+    from app.services.gemini import close_client
+    from app.services.callback_dispatcher import callback_dispatcher
+    from app.tools.callback import close_http_client
+    await close_client()
+    await callback_dispatcher.flush()  # Pending callbacks still go out
+    await close_http_client()
 
 
 # Create FastAPI application
@@ -86,6 +102,7 @@ app = FastAPI(
     """,
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -4,10 +4,17 @@ Intelligence Extraction Models
 Defines the structure for extracted scam intelligence.
 """
 
+from itertools import chain
+
 from pydantic import BaseModel, Field
 from typing import List
 
 
+def _union(first: List[str], second: List[str]) -> List[str]:
+    """Deduplicated union of two lists, keeping first-seen order."""
+    return list(dict.fromkeys(chain(first, second)))
+
+
 class ExtractedIntelligence(BaseModel):
     """
     Intelligence extracted from scam conversations.
@@ -54,45 +61,32 @@ class ExtractedIntelligence(BaseModel):
     
     def is_empty(self) -> bool:
         """Check if any intelligence has been extracted."""
-        return (
-            len(self.bankAccounts) == 0 and
-            len(self.upiIds) == 0 and
-            len(self.phishingLinks) == 0 and
-            len(self.phoneNumbers) == 0 and
-            len(self.suspiciousKeywords) == 0 and
-            len(self.emailAddresses) == 0 and
-            len(self.caseIds) == 0 and
-            len(self.policyNumbers) == 0 and
-            len(self.orderNumbers) == 0
+        return not (
+            self.bankAccounts or
+            self.upiIds or
+            self.phishingLinks or
+            self.phoneNumbers or
+            self.suspiciousKeywords or
+            self.emailAddresses or
+            self.caseIds or
+            self.policyNumbers or
+            self.orderNumbers
         )
     
     def merge(self, other: "ExtractedIntelligence") -> "ExtractedIntelligence":
-        """Merge intelligence from another extraction."""
-        return ExtractedIntelligence(
-            bankAccounts=list(set(self.bankAccounts + other.bankAccounts)),
-            upiIds=list(set(self.upiIds + other.upiIds)),
-            phishingLinks=list(set(self.phishingLinks + other.phishingLinks)),
-            phoneNumbers=list(set(self.phoneNumbers + other.phoneNumbers)),
-            suspiciousKeywords=list(set(self.suspiciousKeywords + other.suspiciousKeywords)),
-            emailAddresses=list(set(self.emailAddresses + other.emailAddresses)),
-            caseIds=list(set(self.caseIds + other.caseIds)),
-            policyNumbers=list(set(self.policyNumbers + other.policyNumbers)),
-            orderNumbers=list(set(self.orderNumbers + other.orderNumbers))
-        )
+        """Merge intelligence from another extraction (deduplicated)."""
+        mine, theirs = self.__dict__, other.__dict__
+        return ExtractedIntelligence(**{
+            name: _union(mine[name], theirs[name]) for name in _FIELD_NAMES
+        })
     
     def to_dict(self) -> dict:
         """Convert to dictionary for GUVI callback."""
-        return {
-            "bankAccounts": self.bankAccounts,
-            "upiIds": self.upiIds,
-            "phishingLinks": self.phishingLinks,
-            "phoneNumbers": self.phoneNumbers,
-            "suspiciousKeywords": self.suspiciousKeywords,
-            "emailAddresses": self.emailAddresses,
-            "caseIds": self.caseIds,
-            "policyNumbers": self.policyNumbers,
-            "orderNumbers": self.orderNumbers
-        }
+        return {name: self.__dict__[name] for name in _FIELD_NAMES}
+
+
+# Field names in declaration order (all List[str])
+_FIELD_NAMES = tuple(ExtractedIntelligence.model_fields)
 
 
 class ScamAnalysis(BaseModel):
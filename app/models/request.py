@@ -5,7 +5,7 @@ Defines the structure for incoming API requests.
 """
 
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 
 
@@ -54,3 +54,21 @@ class HoneypotRequest(BaseModel):
                 }
             }
         }
+
+
+def _inline_refs(node: Any, defs: Dict[str, Any]) -> Any:
+    """Replace local $defs references with the referenced schema."""
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if ref is not None and ref.startswith("#/$defs/"):
+            return _inline_refs(defs[ref[len("#/$defs/"):]], defs)
+        return {key: _inline_refs(value, defs) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_inline_refs(item, defs) for item in node]
+    return node
+
+
+def request_body_schema() -> Dict[str, Any]:
+    """Self-contained JSON schema of HoneypotRequest for the OpenAPI document."""
+    schema = HoneypotRequest.model_json_schema()
+    return _inline_refs(schema, schema.pop("$defs", {}))
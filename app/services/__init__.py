@@ -4,7 +4,9 @@ Services Package
 Core services for the Honeypot API.
 """
 
-from app.services.gemini import get_client, generate_text, generate_json
+from app.services.gemini import get_client, generate_text, generate_text_stream, generate_json
+from app.services.cache import TTLCache
+from app.services.regex import compile_pattern
 from app.services.session import (
     ConversationSession,
     SessionStore,
@@ -16,7 +18,12 @@ __all__ = [
     # Gemini LLM Service
     "get_client",
     "generate_text",
+    "generate_text_stream",
     "generate_json",
+    # Caching
+    "TTLCache",
+    # Regex backend
+    "compile_pattern",
     # Session Management
     "ConversationSession",
     "SessionStore",
@@ -0,0 +1,105 @@
+"""
+Callback Dispatcher
+
+Coalesces the per-turn GUVI callbacks of each session. The evaluator only
+scores the latest callback, so when a client sends turns back to back the
+earlier payloads are superseded before they go out.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+from app.tools.callback import send_guvi_callback
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class CallbackDispatcher:
+    """
+    Debounced sender for GUVI callbacks, keyed by session.
+
+    submit() records the latest callback arguments for a session and
+    returns immediately. The worker waits debounce_ms after the first
+    pending submission, then sends the latest payload of every pending
+    session concurrently over the shared callback client.
+    """
+
+    def __init__(self, debounce_ms: int = 250):
+        self.debounce = debounce_ms / 1000
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    def submit(self, session_id: str, **kwargs):
+        """
+        Queue a callback, replacing any pending one for the same session.
+
+        Args:
+            session_id: Session the callback reports on
+            **kwargs: Other send_guvi_callback arguments
+        """
+        self._ensure_worker()
+        self._pending[session_id] = kwargs
+        self._wakeup.set()
+
+    async def flush(self, session_id: Optional[str] = None) -> Optional[dict]:
+        """
+        Send pending callbacks now instead of waiting for the timer.
+
+        Args:
+            session_id: Only send this session's callback; None sends every
+                pending callback and waits for those already in flight
+
+        Returns:
+            The callback result for session_id, or None if nothing was pending
+        """
+        if session_id is not None:
+            kwargs = self._pending.pop(session_id, None)
+            if kwargs is None:
+                return None
+            return await send_guvi_callback(session_id=session_id, **kwargs)
+
+        batch, self._pending = self._pending, {}
+        await self._send(batch)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        return None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.debounce)
+            self._wakeup.clear()
+            batch, self._pending = self._pending, {}
+            if not batch:
+                continue
+
+            # Send without holding up the next window
+            task = self._loop.create_task(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: Dict[str, Dict[str, Any]]):
+        if not batch:
+            return
+        logger.info("Dispatching %d GUVI callback(s)", len(batch))
+        # send_guvi_callback reports failures in its result instead of raising
+        await asyncio.gather(
+            *(send_guvi_callback(session_id=session_id, **kwargs) for session_id, kwargs in batch.items()),
+            return_exceptions=True
+        )
+
+
+callback_dispatcher = CallbackDispatcher(debounce_ms=settings.callback_debounce_ms)
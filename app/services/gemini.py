@@ -6,17 +6,49 @@ No complex ADK - just straightforward API calls.
 """
 
 import os
+import re
 import json
+import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
+import httpx
+import orjson
 from google import genai
 from google.genai import types
 
+from app.config import get_settings
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Markdown code fence around a JSON payload (```json ... ``` or ``` ... ```)
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+
+# Minimum number of new characters before re-parsing a streamed buffer
+STREAM_PARSE_MIN_DELTA = 64
 
 # Singleton client
 _client: Optional[genai.Client] = None
 
+# Bounds in-flight Gemini requests per process (provider rate limits)
+_gemini_semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
+
+# Shared HTTP connection pool (keep-alive + HTTP/2) for all Gemini calls
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the pooled async HTTP client used by the Gemini client."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+            timeout=60.0,
+            http2=True
+        )
+    return _http_client
+
 
 def get_client() -> genai.Client:
     """Get or create the Gemini client (singleton)."""
@@ -25,11 +57,115 @@ def get_client() -> genai.Client:
         api_key = os.environ.get('GOOGLE_API_KEY')
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable not set")
-        _client = genai.Client(api_key=api_key)
+        _client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(httpx_async_client=get_http_client())
+        )
         logger.info("✅ Gemini client initialized")
     return _client
 
 
+async def close_client():
+    """Close the shared HTTP connection pool (call on application shutdown)."""
+    global _client, _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _client = None
+
+
+async def warm_up(model: str, timeout: float = 5.0) -> bool:
+    """
+    Send one minimal request so the first real turn finds the connection ready.
+    
+    Opens the pooled connection (DNS, TCP, TLS/HTTP2) ahead of traffic.
+    Failures are logged and ignored.
+    
+    Args:
+        model: Model to warm up
+        timeout: Seconds to wait before giving up
+        
+    Returns:
+        Whether the request succeeded
+    """
+    try:
+        await asyncio.wait_for(
+            generate_text("ping", model=model, temperature=0.0, max_tokens=8, thinking_level="minimal"),
+            timeout
+        )
+        return True
+    except Exception as e:
+        logger.warning("Gemini warm-up failed: %r", e)
+        return False
+
+
+def parse_json_text(text: str) -> Any:
+    """Parse a JSON payload, stripping a surrounding markdown code fence if present."""
+    match = _FENCE_RE.search(text)
+    if match:
+        text = match.group(1)
+    return orjson.loads(text)
+
+
+def maybe_parse_json(
+    text: str,
+    last_parsed_len: int = 0,
+    is_final: bool = False,
+    cached: Any = None
+) -> Tuple[Any, int]:
+    """
+    Parse a (possibly still streaming) JSON buffer only when worthwhile.
+    
+    Re-parsing the whole buffer on every streamed token is O(N^2), so the
+    buffer is only parsed once the stream is final, or when at least
+    STREAM_PARSE_MIN_DELTA new characters arrived and it ends like a complete
+    payload ('}' or a closing fence).
+    
+    Args:
+        text: Accumulated response text
+        last_parsed_len: Buffer length at the previous successful parse
+        is_final: Whether the stream has finished
+        cached: Result of the previous parse, returned when parsing is skipped
+        
+    Returns:
+        Tuple of (parsed result or cached, buffer length it corresponds to)
+    """
+    if not is_final:
+        if len(text) - last_parsed_len < STREAM_PARSE_MIN_DELTA:
+            return cached, last_parsed_len
+        tail = text.rstrip()
+        if not (tail.endswith("}") or tail.endswith("```")):
+            return cached, last_parsed_len
+    
+    try:
+        return parse_json_text(text.strip()), len(text)
+    except json.JSONDecodeError:
+        if is_final:
+            raise
+        return cached, last_parsed_len
+
+
+@lru_cache(maxsize=32)
+def get_generation_config(
+    temperature: float = 1.0,
+    max_tokens: int = 1024,
+    thinking_level: Optional[str] = None,
+    response_schema: Optional[type] = None
+) -> types.GenerateContentConfig:
+    """Get a cached generation config (built once per parameter combination)."""
+    config_kwargs = {
+        "temperature": temperature,
+        "max_output_tokens": max_tokens,
+    }
+    if thinking_level:
+        config_kwargs["thinking_config"] = types.ThinkingConfig(thinking_level=thinking_level)
+    if response_schema is not None:
+        # Structured output: the model is constrained to this JSON shape
+        config_kwargs["response_mime_type"] = "application/json"
+        config_kwargs["response_schema"] = response_schema
+    return types.GenerateContentConfig(**config_kwargs)
+
+
 async def generate_text(
     prompt: str,
     model: str = "gemini-3-flash-preview",
@@ -55,13 +191,7 @@ async def generate_text(
     client = get_client()
     
     try:
-        config_kwargs = {
-            "temperature": temperature,
-            "max_output_tokens": max_tokens,
-        }
-        if thinking_level:
-            config_kwargs["thinking_config"] = types.ThinkingConfig(thinking_level=thinking_level)
-        config = types.GenerateContentConfig(**config_kwargs)
+        config = get_generation_config(temperature, max_tokens, thinking_level)
         
         # Build contents
         if system_instruction:
@@ -73,16 +203,55 @@ async def generate_text(
         else:
             contents = prompt
         
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=config
-        )
+        async with _gemini_semaphore:
+            response = await client.aio.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config
+            )
         
         return response.text
         
     except Exception as e:
-        logger.error(f"Gemini API error: {e}")
+        logger.error("Gemini API error: %s", e)
+        raise
+
+
+async def generate_text_stream(
+    prompt: str,
+    model: str = "gemini-3-flash-preview",
+    temperature: float = 1.0,
+    max_tokens: int = 1024,
+    thinking_level: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Stream generated text from Gemini chunk by chunk.
+    
+    Args:
+        prompt: The user prompt
+        model: Model name
+        temperature: Creativity (0.0 = deterministic, 1.0+ = creative)
+        max_tokens: Maximum response length
+        thinking_level: Optional thinking depth ('low', 'medium', 'high', 'minimal')
+        
+    Yields:
+        Text chunks as they arrive
+    """
+    client = get_client()
+    config = get_generation_config(temperature, max_tokens, thinking_level)
+    
+    try:
+        async with _gemini_semaphore:
+            stream = await client.aio.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config=config
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+    except Exception as e:
+        logger.error("Gemini API error: %s", e)
         raise
 
 
@@ -90,7 +259,10 @@ async def generate_json(
     prompt: str,
     model: str = "gemini-3-flash-preview",
     temperature: float = 1.0,
-    thinking_level: Optional[str] = "low"
+    thinking_level: Optional[str] = "low",
+    response_schema: Optional[type] = None,
+    raise_errors: bool = False,
+    max_tokens: int = 1024
 ) -> Dict[str, Any]:
     """
     Generate structured JSON response.
@@ -100,6 +272,9 @@ async def generate_json(
         model: Model name
         temperature: Low for consistent JSON
         thinking_level: Thinking depth (default 'low' for JSON extraction)
+        response_schema: Optional Pydantic model to enforce via structured output
+        raise_errors: Re-raise API errors instead of returning {} (for callers that retry)
+        max_tokens: Output cap (thinking tokens count against it)
         
     Returns:
         Parsed JSON dict
@@ -107,35 +282,25 @@ async def generate_json(
     client = get_client()
     
     try:
-        config_kwargs = {
-            "temperature": temperature,
-            "max_output_tokens": 1024,
-        }
-        if thinking_level:
-            config_kwargs["thinking_config"] = types.ThinkingConfig(thinking_level=thinking_level)
-        config = types.GenerateContentConfig(**config_kwargs)
-        
-        response = client.models.generate_content(
-            model=model,
-            contents=prompt,
-            config=config
-        )
-        
-        text = response.text.strip()
+        config = get_generation_config(temperature, max_tokens, thinking_level, response_schema)
         
-        # Clean markdown code blocks if present
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
+        async with _gemini_semaphore:
+            response = await client.aio.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=config
+            )
         
-        return json.loads(text)
+        text = response.text.strip()
+        return parse_json_text(text)
         
     except json.JSONDecodeError as e:
-        logger.error(f"JSON parse error: {e}, raw: {text[:200]}")
+        logger.error("JSON parse error: %s, raw: %.200s", e, text)
         return {}
     except Exception as e:
-        logger.error(f"Gemini API error: {e}")
+        logger.error("Gemini API error: %s", e)
+        if raise_errors:
+            raise
         return {}
 
 
@@ -185,19 +350,14 @@ class GeminiChat:
         )
         
         try:
-            config_kwargs = {
-                "temperature": self.temperature,
-                "max_output_tokens": 1024,
-            }
-            if self.thinking_level:
-                config_kwargs["thinking_config"] = types.ThinkingConfig(thinking_level=self.thinking_level)
-            config = types.GenerateContentConfig(**config_kwargs)
+            config = get_generation_config(self.temperature, 1024, self.thinking_level)
             
-            response = client.models.generate_content(
-                model=self.model,
-                contents=self.history,
-                config=config
-            )
+            async with _gemini_semaphore:
+                response = await client.aio.models.generate_content(
+                    model=self.model,
+                    contents=self.history,
+                    config=config
+                )
             
             response_text = response.text
             
@@ -209,7 +369,7 @@ class GeminiChat:
             return response_text
             
         except Exception as e:
-            logger.error(f"Chat error: {e}")
+            logger.error("Chat error: %s", e)
             # Remove failed user message from history
             self.history.pop()
             raise
@@ -0,0 +1,84 @@
+"""
+LLM Retry
+
+Retries rate-limited or temporarily unavailable Gemini JSON calls with
+exponential backoff, within a short deadline so a request waiting on the
+result is never held up for long.
+"""
+
+import random
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from google.genai import errors
+
+from app.services.gemini import generate_json
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# HTTP status codes worth retrying (rate limited / temporarily unavailable)
+RETRYABLE_CODES = frozenset({429, 500, 503})
+
+# First backoff delay in seconds, doubled on every retry. Every delay,
+# including a server's Retry-After, is capped at BACKOFF_MAX.
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 2.0
+
+# Total seconds spent on retries; callers run inside /analyze (holding the
+# session lock) and have a cheaper fallback, so give up early
+RETRY_DEADLINE = 4.0
+
+
+def _retry_after(error: errors.APIError) -> Optional[float]:
+    """Read the Retry-After header (seconds) from a failed response, if any."""
+    headers = getattr(error.response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def generate_json_with_retry(
+    max_retries: int = 3,
+    deadline: float = RETRY_DEADLINE,
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    Call generate_json, retrying retryable API errors with exponential backoff.
+
+    Waits for the server's Retry-After when present, otherwise
+    BACKOFF_BASE * 2**attempt seconds with jitter, never more than
+    BACKOFF_MAX. Gives up when the next wait would pass the deadline.
+
+    Args:
+        max_retries: Retries after the first attempt
+        deadline: Seconds from the first attempt after which no retry starts
+        **kwargs: Passed through to generate_json
+
+    Returns:
+        Parsed JSON dict
+
+    Raises:
+        errors.APIError: If the call still fails after all retries
+    """
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline
+    for attempt in range(max_retries + 1):
+        try:
+            return await generate_json(raise_errors=True, **kwargs)
+        except errors.APIError as e:
+            if e.code not in RETRYABLE_CODES or attempt == max_retries:
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = BACKOFF_BASE * 2 ** attempt * random.uniform(0.8, 1.2)
+            delay = min(delay, BACKOFF_MAX)
+            if loop.time() + delay > give_up_at:
+                raise
+            logger.warning("Gemini %s, retry %d/%d in %.2fs", e.code, attempt + 1, max_retries, delay)
+            await asyncio.sleep(delay)
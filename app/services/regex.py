@@ -0,0 +1,48 @@
+"""
+Regex Backend
+
+Compiles hot-path extraction patterns with google-re2 (linear-time DFA
+matching, immune to catastrophic backtracking) when enabled via
+REGEX_BACKEND=re2 and installed; otherwise uses the stdlib `re` engine.
+"""
+
+import re
+import logging
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+try:
+    import re2
+except ImportError:  # optional dependency
+    re2 = None
+
+if settings.regex_backend == "re2" and re2 is None:
+    logger.warning("REGEX_BACKEND=re2 but google-re2 is not installed; using re")
+
+# Whether patterns passed to compile_pattern() are compiled with RE2
+RE2_AVAILABLE = re2 is not None and settings.regex_backend == "re2"
+
+
+def compile_pattern(pattern: str, flags: int = 0):
+    """
+    Compile a pattern with RE2 if enabled, else with `re`.
+
+    Only pass patterns RE2 can handle (no lookaround or backreferences).
+    RE2 treats \\b, \\d and \\w as ASCII-only, which suits the ID/number
+    formats we extract.
+
+    Args:
+        pattern: Regular expression
+        flags: `re` flags; only re.IGNORECASE is translated for RE2
+
+    Returns:
+        Compiled pattern exposing findall/finditer/search
+    """
+    if RE2_AVAILABLE and not flags & ~re.IGNORECASE:
+        if flags & re.IGNORECASE:
+            pattern = "(?i)" + pattern
+        return re2.compile(pattern)
+    return re.compile(pattern, flags)
@@ -0,0 +1,110 @@
+"""
+Semantic Cache
+
+Serves the scam verdict and persona reply for opening messages that are
+near-duplicates of one seen recently (templated scam SMS with different
+names, amounts and links), skipping the detection and reply Gemini calls.
+
+Enabled with SEMANTIC_CACHE_ENABLED=true and needs sentence-transformers
+(which brings numpy); without it the cache stays disabled.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency (installed with sentence-transformers)
+    np = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional dependency
+    SentenceTransformer = None
+
+if settings.semantic_cache_enabled and SentenceTransformer is None:
+    logger.warning("SEMANTIC_CACHE_ENABLED=true but sentence-transformers is not installed; cache disabled")
+
+# Whether lookups can run at all (the model is loaded separately, at startup)
+SEMANTIC_CACHE_AVAILABLE = settings.semantic_cache_enabled and SentenceTransformer is not None
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over normalized sentence embeddings.
+
+    Entries are kept per namespace (the persona, so a reply is only reused
+    in the same voice and language) in a fixed-size ring; the oldest entry
+    is overwritten when a namespace is full. At a few thousand rows a
+    brute-force inner product is well under a millisecond, so no ANN index
+    is needed. Embedding runs in a worker thread.
+    """
+
+    def __init__(self, model_name: str, threshold: float, maxsize: int):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._model = None
+        # namespace -> (embedding matrix, payloads, next slot, filled rows)
+        self._entries: Dict[str, List[Any]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """Load the embedding model (blocking; call once at startup)."""
+        if SEMANTIC_CACHE_AVAILABLE and self._model is None:
+            self._model = SentenceTransformer(self.model_name)
+            logger.info("Semantic cache model loaded: %s", self.model_name)
+
+    def _embed(self, text: str):
+        return self._model.encode(text, normalize_embeddings=True)
+
+    async def lookup(self, text: str, namespace: str):
+        """
+        Find a cached payload for a near-duplicate text.
+
+        Returns:
+            (embedding, payload); payload is None on a miss. Pass the
+            embedding back to add() to avoid encoding the text twice.
+        """
+        if not self.ready:
+            return None, None
+        embedding = await asyncio.to_thread(self._embed, text)
+        entry = self._entries.get(namespace)
+        if entry is None or entry[3] == 0:
+            return embedding, None
+        matrix, payloads, _, filled = entry
+        scores = matrix[:filled] @ embedding
+        best = int(scores.argmax())
+        if scores[best] < self.threshold:
+            return embedding, None
+        return embedding, payloads[best]
+
+    def add(self, embedding, namespace: str, payload: Any):
+        """Store a payload under an embedding returned by lookup()."""
+        if embedding is None:
+            return
+        entry = self._entries.get(namespace)
+        if entry is None:
+            matrix = np.zeros((self.maxsize, embedding.shape[0]), dtype=embedding.dtype)
+            entry = self._entries[namespace] = [matrix, [None] * self.maxsize, 0, 0]
+        matrix, payloads, slot, filled = entry
+        matrix[slot] = embedding
+        payloads[slot] = payload
+        entry[2] = (slot + 1) % self.maxsize
+        entry[3] = min(filled + 1, self.maxsize)
+
+
+semantic_cache = SemanticCache(
+    model_name=settings.semantic_cache_model,
+    threshold=settings.semantic_cache_threshold,
+    maxsize=settings.semantic_cache_size
+)
@@ -4,13 +4,17 @@ Session Management Service
 Handles conversation session storage and retrieval.
 """
 
+import asyncio
 import logging
+import orjson
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional
 from dataclasses import dataclass, field
+from weakref import WeakValueDictionary
 
 from app.config import get_settings
-from app.agents.intelligence_extractor import ExtractedIntelligence
+from app.models.intelligence import ExtractedIntelligence
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -27,9 +31,33 @@ class ConversationSession:
     scam_type: str = "unknown"
     confidence_level: float = 0.0
     intelligence: Optional[ExtractedIntelligence] = None
+    intel_scanned_count: int = 0  # Leading messages already regex-scanned into intelligence
     agent_notes: str = ""
+    summary: str = ""  # Running summary of older messages for the reply prompt
+    summary_upto_idx: int = 0  # Leading messages covered by summary
     callback_sent: bool = False
     persona_type: str = "elderly"
+    # "sender: text" lines of the latest messages (the LLM extraction window),
+    # formatted once on arrival; rebuilt from messages, never persisted
+    recent_lines: Deque[str] = field(
+        default_factory=lambda: deque(maxlen=settings.llm_extraction_window),
+        repr=False,
+        compare=False
+    )
+    
+    # "SENDER: text" transcript of every message, extended on each add_message
+    # instead of re-joined per request; rebuilt from messages, never persisted
+    transcript: str = field(default="", init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if self.messages:
+            if not self.recent_lines:
+                self.recent_lines.extend(
+                    f"{m['sender']}: {m['text']}" for m in self.messages[-self.recent_lines.maxlen:]
+                )
+            self.transcript = "\n".join(
+                f"{m['sender'].upper()}: {m['text']}" for m in self.messages
+            )
     
     @property
     def message_count(self) -> int:
@@ -58,6 +86,9 @@ class ConversationSession:
             "text": text,
             "timestamp": ts.isoformat()
         })
+        self.recent_lines.append(f"{sender}: {text}")
+        line = f"{sender.upper()}: {text}"
+        self.transcript = f"{self.transcript}\n{line}" if self.transcript else line
         self.updated_at = datetime.utcnow()
     
     def is_expired(self) -> bool:
@@ -79,14 +110,23 @@ class SessionStore:
     
     def __init__(self):
         self._sessions: Dict[str, ConversationSession] = {}
+        # Held only while a request uses them, so entries go away on their own
+        self._locks: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
         logger.info("Initialized in-memory session store")
     
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Lock serializing requests for one session (hold it across get/update)."""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+    
     def get(self, session_id: str) -> Optional[ConversationSession]:
         """Get a session by ID."""
         session = self._sessions.get(session_id)
         
         if session and session.is_expired():
-            logger.info(f"Session {session_id} has expired")
+            logger.info("Session %s has expired", session_id)
             self.delete(session_id)
             return None
             
@@ -99,7 +139,7 @@ class SessionStore:
             persona_type=persona_type
         )
         self._sessions[session_id] = session
-        logger.info(f"Created new session: {session_id}")
+        logger.info("Created new session: %s", session_id)
         return session
     
     def get_or_create(self, session_id: str, persona_type: str = "elderly") -> ConversationSession:
@@ -118,7 +158,7 @@ class SessionStore:
         """Delete a session."""
         if session_id in self._sessions:
             del self._sessions[session_id]
-            logger.info(f"Deleted session: {session_id}")
+            logger.info("Deleted session: %s", session_id)
     
     def cleanup_expired(self):
         """Remove all expired sessions."""
@@ -130,7 +170,7 @@ class SessionStore:
             self.delete(sid)
         
         if expired:
-            logger.info(f"Cleaned up {len(expired)} expired sessions")
+            logger.info("Cleaned up %d expired sessions", len(expired))
     
     def count(self) -> int:
         """Get total number of active sessions."""
@@ -153,16 +193,23 @@ class RedisSessionStore:
         import redis
         self._client = redis.from_url(redis_url)
         self._prefix = "honeypot:session:"
+        # Serializes requests within this process only
+        self._locks: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
         logger.info(f"Connected to Redis session store")
     
+    def lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+    
     def _key(self, session_id: str) -> str:
         return f"{self._prefix}{session_id}"
     
     def get(self, session_id: str) -> Optional[ConversationSession]:
-        import json
         data = self._client.get(self._key(session_id))
         if data:
-            return self._deserialize(json.loads(data))
+            return self._deserialize(orjson.loads(data))
         return None
     
     def create(self, session_id: str, persona_type: str = "elderly") -> ConversationSession:
@@ -183,12 +230,11 @@ class RedisSessionStore:
         self._save(session)
     
     def _save(self, session: ConversationSession):
-        import json
         data = self._serialize(session)
         self._client.setex(
             self._key(session.session_id),
             settings.session_timeout,
-            json.dumps(data)
+            orjson.dumps(data)
         )
     
     def _serialize(self, session: ConversationSession) -> dict:
@@ -201,7 +247,10 @@ class RedisSessionStore:
             "scam_type": session.scam_type,
             "confidence_level": session.confidence_level,
             "intelligence": session.intelligence.to_dict() if session.intelligence else {},
+            "intel_scanned_count": session.intel_scanned_count,
             "agent_notes": session.agent_notes,
+            "summary": session.summary,
+            "summary_upto_idx": session.summary_upto_idx,
             "callback_sent": session.callback_sent,
             "persona_type": session.persona_type
         }
@@ -216,7 +265,10 @@ class RedisSessionStore:
             scam_type=data["scam_type"],
             confidence_level=data.get("confidence_level", 0.0),
             intelligence=ExtractedIntelligence(**data["intelligence"]),
+            intel_scanned_count=data.get("intel_scanned_count", 0),
             agent_notes=data["agent_notes"],
+            summary=data.get("summary", ""),
+            summary_upto_idx=data.get("summary_upto_idx", 0),
             callback_sent=data["callback_sent"],
             persona_type=data["persona_type"]
         )
@@ -6,13 +6,38 @@ Sends final intelligence results to the GUVI evaluation endpoint.
 
 import httpx
 import logging
+import orjson
 from typing import Optional, Union
 from app.config import get_settings
-from app.agents.intelligence_extractor import ExtractedIntelligence
+from app.models.intelligence import ExtractedIntelligence
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Shared keep-alive pool: callbacks go to the same host on every turn, so
+# reusing connections skips a TCP + TLS handshake per callback
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the pooled async HTTP client used for callbacks."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            http2=True
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the callback connection pool (call on application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+
 
 async def send_guvi_callback(
     session_id: str,
@@ -70,41 +95,40 @@ async def send_guvi_callback(
         "confidenceLevel": confidence_level
     }
     
-    logger.info(f"Sending GUVI callback for session {session_id}")
-    logger.debug(f"Callback payload: {payload}")
+    logger.info("Sending GUVI callback for session %s", session_id)
+    logger.debug("Callback payload: %s", payload)
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                settings.guvi_callback_url,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
+        response = await get_http_client().post(
+            settings.guvi_callback_url,
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"}
+        )
+        
+        if response.status_code == 200:
+            logger.info("✅ GUVI callback successful for session %s", session_id)
+            return {
+                "status": "success",
+                "message": "Callback sent successfully",
+                "response_code": response.status_code
+            }
+        else:
+            logger.error("❌ GUVI callback failed: %s - %s", response.status_code, response.text)
+            return {
+                "status": "error",
+                "message": f"Callback failed with status {response.status_code}",
+                "response_code": response.status_code,
+                "response_text": response.text
+            }
             
-            if response.status_code == 200:
-                logger.info(f"✅ GUVI callback successful for session {session_id}")
-                return {
-                    "status": "success",
-                    "message": "Callback sent successfully",
-                    "response_code": response.status_code
-                }
-            else:
-                logger.error(f"❌ GUVI callback failed: {response.status_code} - {response.text}")
-                return {
-                    "status": "error",
-                    "message": f"Callback failed with status {response.status_code}",
-                    "response_code": response.status_code,
-                    "response_text": response.text
-                }
-                
     except httpx.TimeoutException:
-        logger.error(f"⏰ GUVI callback timeout for session {session_id}")
+        logger.error("⏰ GUVI callback timeout for session %s", session_id)
         return {
             "status": "error",
             "message": "Callback request timed out"
         }
     except Exception as e:
-        logger.error(f"💥 GUVI callback error: {str(e)}")
+        logger.error("💥 GUVI callback error: %s", e)
         return {
             "status": "error",
             "message": str(e)
@@ -55,6 +55,14 @@ SUSPICIOUS_KEYWORDS = [
 ]
 
 
+# Compiled once at import (same order and flags as the lists above)
+_BANK_ACCOUNT_RES = tuple(re.compile(p, re.IGNORECASE) for p in BANK_ACCOUNT_PATTERNS)
+_UPI_RES = tuple(re.compile(p, re.IGNORECASE) for p in UPI_PATTERNS)
+_PHONE_RES = tuple(re.compile(p) for p in PHONE_PATTERNS)
+_URL_RES = tuple(re.compile(p, re.IGNORECASE) for p in URL_PATTERNS)
+_SEPARATOR_RE = re.compile(r'[\s-]')
+
+
 # ============================================
 # EXTRACTION FUNCTIONS (ADK Tools)
 # ============================================
@@ -70,11 +78,11 @@ def extract_bank_accounts(text: str) -> dict:
         Dictionary with extracted bank account numbers
     """
     accounts = set()
-    for pattern in BANK_ACCOUNT_PATTERNS:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    for pattern in _BANK_ACCOUNT_RES:
+        matches = pattern.findall(text)
         for match in matches:
             # Clean and validate
-            clean = re.sub(r'[\s-]', '', str(match))
+            clean = _SEPARATOR_RE.sub('', str(match))
             if 9 <= len(clean) <= 18 and clean.isdigit():
                 accounts.add(clean)
     
@@ -96,8 +104,8 @@ def extract_upi_ids(text: str) -> dict:
         Dictionary with extracted UPI IDs
     """
     upi_ids = set()
-    for pattern in UPI_PATTERNS:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    for pattern in _UPI_RES:
+        matches = pattern.findall(text)
         for match in matches:
             if isinstance(match, tuple):
                 continue  # Skip group matches
@@ -123,11 +131,11 @@ def extract_phone_numbers(text: str) -> dict:
         Dictionary with extracted phone numbers
     """
     phones = set()
-    for pattern in PHONE_PATTERNS:
-        matches = re.findall(pattern, text)
+    for pattern in _PHONE_RES:
+        matches = pattern.findall(text)
         for match in matches:
             # Clean and format
-            clean = re.sub(r'[\s-]', '', str(match))
+            clean = _SEPARATOR_RE.sub('', str(match))
             # Normalize to +91 format
             if len(clean) == 10:
                 clean = "+91" + clean
@@ -157,8 +165,8 @@ def extract_urls(text: str) -> dict:
         Dictionary with extracted URLs
     """
     urls = set()
-    for pattern in URL_PATTERNS:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    for pattern in _URL_RES:
+        matches = pattern.findall(text)
         for match in matches:
             url = match.lower()
             # Add http:// if missing
@@ -4,6 +4,8 @@ API Endpoint Tests
 
 import pytest
 from fastapi.testclient import TestClient
+from app.api.routes import _llm_extraction_worthwhile
+from app.services.session import ConversationSession
 
 
 class TestHealthEndpoint:
@@ -55,6 +57,17 @@ class TestAuthentication:
         assert response.status_code not in [401, 403]
 
 
+    def test_docs_subpath_exempt(self, client):
+        """Documentation sub-pages should not require an API key."""
+        response = client.get("/docs/oauth2-redirect")
+        assert response.status_code not in [401, 403]
+    
+    def test_exempt_prefix_not_too_broad(self, client):
+        """Paths that merely start with an exempt name still need a key."""
+        response = client.get("/docsecret")
+        assert response.status_code == 401
+
+
 class TestAnalyzeEndpoint:
     """Tests for the main analyze endpoint."""
     
@@ -69,6 +82,24 @@ class TestAnalyzeEndpoint:
         )
         assert response.status_code == 422  # Validation error
     
+    def test_large_invalid_body_rejected(self, client, sample_scam_message, auth_headers):
+        """Bodies validated off the event loop still get a 422 on errors."""
+        invalid_request = dict(sample_scam_message, message={"sender": "scammer"})
+        invalid_request["conversationHistory"] = [sample_scam_message["message"]] * 1000
+        response = client.post(
+            "/api/analyze",
+            json=invalid_request,
+            headers=auth_headers
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"][:2] == ["body", "message"]
+    
+    def test_request_body_documented(self, client):
+        """The request schema should still appear in the OpenAPI document."""
+        spec = client.get("/openapi.json").json()
+        schema = spec["paths"]["/api/analyze"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+        assert "sessionId" in schema["properties"]
+    
     def test_analyze_response_structure(self, client, sample_scam_message, auth_headers):
         """Test response has required fields."""
         response = client.post(
@@ -103,3 +134,21 @@ class TestSessionEndpoints:
             headers=auth_headers
         )
         assert response.status_code == 404
+
+
+class TestExtractionGate:
+    """Tests for skipping LLM extraction on sessions judged benign."""
+    
+    def test_unclassified_session_uses_llm(self):
+        """Before any verdict the LLM extractor should run."""
+        assert _llm_extraction_worthwhile(ConversationSession(session_id="gate-1"))
+    
+    def test_low_confidence_benign_skips_llm(self):
+        """A confident non-scam verdict should switch to regex-only."""
+        session = ConversationSession(session_id="gate-2", scam_type="none", confidence_level=0.2)
+        assert not _llm_extraction_worthwhile(session)
+    
+    def test_detected_scam_uses_llm(self):
+        """Detected scams always get LLM extraction."""
+        session = ConversationSession(session_id="gate-3", scam_detected=True, scam_type="upi_fraud", confidence_level=0.9)
+        assert _llm_extraction_worthwhile(session)
@@ -0,0 +1,49 @@
+"""
+In-Memory Cache Tests
+"""
+
+import pytest
+from app.services.cache import TTLCache
+
+
+class TestTTLCache:
+    """Tests for the TTL + LRU cache."""
+    
+    def test_set_and_get(self):
+        """Stored values should be returned."""
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert "a" in cache
+    
+    def test_missing_key_returns_default(self):
+        """Missing keys should return the default."""
+        cache = TTLCache(maxsize=4, ttl=60)
+        assert cache.get("missing") is None
+        assert cache.get("missing", "fallback") == "fallback"
+    
+    def test_delete(self):
+        """Deleted keys should be gone; missing keys are ignored."""
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set("a", 1)
+        cache.delete("a")
+        cache.delete("missing")
+        assert "a" not in cache
+    
+    def test_expired_entry(self):
+        """Expired entries should not be returned."""
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set("a", 1, ttl=-1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+    
+    def test_evicts_least_recently_used(self):
+        """Oldest unused entry should be evicted when full."""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
@@ -0,0 +1,36 @@
+"""
+GUVI Callback Tests
+"""
+
+import asyncio
+
+import httpx
+from app.tools import callback
+from app.tools.callback import send_guvi_callback
+
+
+class TestCallbackClient:
+    """Tests for the pooled callback HTTP client."""
+
+    def test_reuses_shared_client(self, monkeypatch):
+        """Consecutive callbacks should go through the same pooled client."""
+        requests = []
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"ok": True})
+
+        async def main():
+            monkeypatch.setattr(callback, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+            shared = callback.get_http_client()
+            results = [
+                await send_guvi_callback("s1", True, 2, {}, "notes"),
+                await send_guvi_callback("s1", True, 4, {}, "notes"),
+            ]
+            assert callback.get_http_client() is shared
+            await callback.close_http_client()
+            return results
+
+        results = asyncio.run(main())
+        assert [r["status"] for r in results] == ["success", "success"]
+        assert len(requests) == 2
+        assert callback._http_client is None
@@ -0,0 +1,52 @@
+"""
+Callback Dispatcher Tests
+"""
+
+import asyncio
+
+from app.services import callback_dispatcher as dispatcher_module
+from app.services.callback_dispatcher import CallbackDispatcher
+
+
+class TestCallbackDispatcher:
+    """Tests for coalescing per-turn GUVI callbacks."""
+
+    def test_latest_payload_per_session(self, monkeypatch):
+        """Back-to-back callbacks for a session collapse into the newest one."""
+        sent = []
+        async def fake_send(session_id, **kwargs):
+            sent.append((session_id, kwargs["total_messages"]))
+            return {"status": "success"}
+        monkeypatch.setattr(dispatcher_module, "send_guvi_callback", fake_send)
+
+        async def main():
+            dispatcher = CallbackDispatcher(debounce_ms=10)
+            dispatcher.submit("s1", total_messages=2)
+            dispatcher.submit("s2", total_messages=2)
+            dispatcher.submit("s1", total_messages=4)
+            await asyncio.sleep(0.05)
+
+        asyncio.run(main())
+        assert sorted(sent) == [("s1", 4), ("s2", 2)]
+
+    def test_flush_session_sends_now(self, monkeypatch):
+        """Flushing one session sends its pending callback and returns the result."""
+        sent = []
+        async def fake_send(session_id, **kwargs):
+            sent.append(session_id)
+            return {"status": "success"}
+        monkeypatch.setattr(dispatcher_module, "send_guvi_callback", fake_send)
+
+        async def main():
+            dispatcher = CallbackDispatcher(debounce_ms=10_000)
+            dispatcher.submit("s1", total_messages=2)
+            dispatcher.submit("s2", total_messages=2)
+            result = await dispatcher.flush("s1")
+            missing = await dispatcher.flush("s3")
+            await dispatcher.flush()
+            return result, missing
+
+        result, missing = asyncio.run(main())
+        assert result == {"status": "success"}
+        assert missing is None
+        assert sent == ["s1", "s2"]
@@ -0,0 +1,44 @@
+"""
+Combined Analysis Tests
+"""
+
+import asyncio
+
+import pytest
+from app.agents import combined
+from app.agents.combined import analyze_combined
+
+
+class TestAnalyzeCombined:
+    """Tests for the single-call detect/reply/extract agent."""
+
+    def test_unpacks_all_sections(self, monkeypatch):
+        """Verdict, reply and intelligence should come from one call."""
+        calls = []
+        async def fake_generate_json(**kwargs):
+            calls.append(kwargs)
+            return {
+                "is_scam": True,
+                "confidence": 0.9,
+                "scam_type": "upi_fraud",
+                "indicators": ["urgency"],
+                "intelligence": {"upiIds": ["fraud@ybl"], "phoneNumbers": []},
+                "reply": '"YOU: Which UPI app should I open, beta?"'
+            }
+        monkeypatch.setattr(combined, "generate_json", fake_generate_json)
+
+        result = asyncio.run(analyze_combined("Send Rs 500 to fraud@ybl now", [], session_id="combined-1"))
+        assert len(calls) == 1
+        assert result.scam.is_scam and result.scam.scam_type == "upi_fraud"
+        assert result.reply == "Which UPI app should I open, beta?"
+        assert result.intelligence.upiIds == ["fraud@ybl"]
+        assert result.intelligence.bankAccounts == []
+
+    def test_empty_reply_raises(self, monkeypatch):
+        """A response without a reply should raise so the caller falls back."""
+        async def fake_generate_json(**kwargs):
+            return {"is_scam": True, "confidence": 0.9, "scam_type": "other", "indicators": [], "reply": ""}
+        monkeypatch.setattr(combined, "generate_json", fake_generate_json)
+
+        with pytest.raises(ValueError):
+            asyncio.run(analyze_combined("hello", [], session_id="combined-2"))
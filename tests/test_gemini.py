@@ -0,0 +1,37 @@
+"""
+Gemini Service Tests
+"""
+
+import asyncio
+
+from app.services import gemini
+from app.services.gemini import warm_up
+
+
+class TestWarmUp:
+    """Tests for the startup warm-up request."""
+
+    def test_sends_one_tiny_request(self, monkeypatch):
+        """Warm-up should be a single short, low-effort call."""
+        calls = []
+        async def fake_generate_text(prompt, **kwargs):
+            calls.append(kwargs)
+            return "pong"
+        monkeypatch.setattr(gemini, "generate_text", fake_generate_text)
+
+        assert asyncio.run(warm_up("test-model"))
+        assert len(calls) == 1
+        assert calls[0]["model"] == "test-model"
+        assert calls[0]["max_tokens"] <= 8
+
+    def test_failure_and_timeout_are_swallowed(self, monkeypatch):
+        """A failing or slow warm-up must not stop startup."""
+        async def failing(prompt, **kwargs):
+            raise RuntimeError("network down")
+        async def slow(prompt, **kwargs):
+            await asyncio.sleep(1)
+
+        monkeypatch.setattr(gemini, "generate_text", failing)
+        assert not asyncio.run(warm_up("test-model"))
+        monkeypatch.setattr(gemini, "generate_text", slow)
+        assert not asyncio.run(warm_up("test-model", timeout=0.01))
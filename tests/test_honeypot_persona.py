@@ -0,0 +1,143 @@
+"""
+Honeypot Persona Tests
+"""
+
+import asyncio
+
+import orjson
+from app.agents import honeypot_persona
+from app.agents.honeypot_persona import (
+    PERSONAS,
+    SUMMARY_REFRESH_MESSAGES,
+    build_conversation_tail,
+    forget_conversation_tail,
+    generate_response,
+    get_fallback_response,
+    is_fallback_response,
+    summarize_history,
+    summary_due,
+)
+
+
+class TestPersonaPrompts:
+    """Tests for the prompts and prefix patterns prebuilt at import."""
+
+    def test_personas_stay_plain_data(self):
+        """PERSONAS carries no private keys and serializes as JSON."""
+        for persona in PERSONAS.values():
+            assert not any(key.startswith("_") for key in persona)
+        orjson.dumps(PERSONAS)
+
+    def test_prebuilt_matches_fresh_render(self):
+        """Prebuilt prompts equal rendering a copy of the persona."""
+        for persona in PERSONAS.values():
+            assert honeypot_persona.get_persona_prompt(persona) == honeypot_persona.get_persona_prompt(dict(persona))
+
+    def test_custom_persona_with_known_name(self):
+        """A modified persona sharing a name gets its own prompt."""
+        persona = dict(PERSONAS["young_professional"], age=99)
+        assert "99-year-old" in honeypot_persona.get_persona_prompt(persona)
+
+
+class TestHistorySummary:
+    """Tests for the running summary of turns older than the prompt window."""
+
+    def test_not_due_for_short_conversations(self):
+        """Short conversations fit in the window and need no summary."""
+        assert not summary_due(4, 0)
+
+    def test_due_once_window_would_drop_messages(self, monkeypatch):
+        """Long conversations refresh every SUMMARY_REFRESH_MESSAGES messages."""
+        monkeypatch.setattr(honeypot_persona.settings, "history_summary_after", 12)
+        assert summary_due(12, 0)
+        assert not summary_due(12 + SUMMARY_REFRESH_MESSAGES - 1, 12)
+        assert summary_due(12 + SUMMARY_REFRESH_MESSAGES, 12)
+
+    def test_summary_is_incremental(self, monkeypatch):
+        """Only the new messages and the previous summary go into the prompt."""
+        prompts = []
+        async def fake_generate_text(prompt, **kwargs):
+            prompts.append(prompt)
+            return " Caller claims to be from SBI. "
+        monkeypatch.setattr(honeypot_persona, "generate_text", fake_generate_text)
+
+        summary = asyncio.run(summarize_history(
+            "They asked for an OTP.",
+            [{"sender": "scammer", "text": "I am Rahul from SBI"}]
+        ))
+        assert summary == "Caller claims to be from SBI."
+        assert "They asked for an OTP." in prompts[0]
+        assert "THEM: I am Rahul from SBI" in prompts[0]
+
+    def test_summary_reaches_reply_prompt(self, monkeypatch):
+        """generate_response should show the summary before the recent messages."""
+        prompts = []
+        async def fake_stream(prompt, **kwargs):
+            prompts.append(prompt)
+            yield "Who is this?"
+        monkeypatch.setattr(honeypot_persona, "generate_text_stream", fake_stream)
+
+        reply = asyncio.run(generate_response(
+            "Share the OTP", [], session_id="summary-1", summary="They said they are from SBI."
+        ))
+        assert reply == "Who is this?"
+        assert "They said they are from SBI." in prompts[0]
+
+
+class TestUpTo:
+    """Tests for passing the full message list with an up_to bound."""
+
+    def test_same_prompt_as_slice(self, monkeypatch):
+        """up_to should give the same prompt as passing a copied slice."""
+        prompts = []
+        async def fake_stream(prompt, **kwargs):
+            prompts.append(prompt)
+            yield "Which bank?"
+        monkeypatch.setattr(honeypot_persona, "generate_text_stream", fake_stream)
+        monkeypatch.setattr(honeypot_persona, "get_language_for_session", lambda session_id: "english")
+
+        messages = [
+            {"sender": "scammer", "text": "Your account is blocked"},
+            {"sender": "user", "text": "Oh no"},
+            {"sender": "scammer", "text": "Share the OTP"},
+        ]
+        asyncio.run(generate_response("Share the OTP", messages[:-1], session_id="up-to-1"))
+        asyncio.run(generate_response("Share the OTP", messages, session_id="up-to-2", up_to=2))
+        assert prompts[0] == prompts[1]
+
+
+class TestConversationTail:
+    """Tests for the per-session cache of formatted conversation lines."""
+
+    @staticmethod
+    def _history(prefix, count):
+        return [{"sender": "scammer", "text": f"{prefix} {i}"} for i in range(count)]
+
+    def test_incremental_matches_fresh(self):
+        """Appending messages gives the same tail as rendering from scratch."""
+        history = self._history("msg", 6)
+        build_conversation_tail("tail-1", history[:4], "YOU")
+        assert build_conversation_tail("tail-1", history, "YOU") == build_conversation_tail("", history, "YOU")
+
+    def test_reused_session_id_starts_over(self):
+        """A different conversation under a cached id must not keep old lines."""
+        build_conversation_tail("tail-2", self._history("old", 4), "YOU")
+        new = self._history("new", 5)
+        tail = build_conversation_tail("tail-2", new, "YOU")
+        assert "old" not in tail
+        assert tail == build_conversation_tail("", new, "YOU")
+
+    def test_forget(self):
+        """forget_conversation_tail drops the cached entry."""
+        build_conversation_tail("tail-3", self._history("msg", 2), "YOU")
+        forget_conversation_tail("tail-3")
+        assert "tail-3" not in honeypot_persona._conversation_tails
+
+
+class TestFallbackReplies:
+    """Tests for recognising canned replies (kept out of the semantic cache)."""
+
+    def test_fallback_recognised(self):
+        """Canned replies are recognised, generated ones are not."""
+        assert is_fallback_response(get_fallback_response("share the otp"))
+        assert not is_fallback_response("Which branch are you calling from, beta?")
@@ -0,0 +1,227 @@
+"""
+Tests for the agent-level intelligence extractor (regex path, no LLM).
+"""
+
+import asyncio
+
+import pytest
+from app.agents.intelligence_extractor import (
+    extract_intelligence,
+    extract_with_regex,
+    generate_notes,
+    needs_llm_extraction,
+    regex_coverage_sufficient,
+)
+from app.models.intelligence import ExtractedIntelligence
+
+
+class TestRegexKeywordScan:
+    """Test single-pass suspicious keyword detection"""
+    
+    def test_detects_keywords(self):
+        """Should report every keyword present in the text"""
+        intel = extract_with_regex("URGENT: verify your KYC or account will be blocked")
+        assert {"urgent", "verify", "kyc", "block"} <= set(intel.suspiciousKeywords)
+    
+    def test_multi_word_keyword(self):
+        """Should match keywords containing spaces"""
+        intel = extract_with_regex("This is the Income Tax department")
+        assert "income tax" in intel.suspiciousKeywords
+    
+    def test_overlapping_keywords(self):
+        """Should report keywords that overlap in the text"""
+        intel = extract_with_regex("contact rbirs desk")
+        assert {"rbi", "irs"} <= set(intel.suspiciousKeywords)
+    
+    def test_no_keywords(self):
+        """Should return no keywords for benign text"""
+        intel = extract_with_regex("See you at dinner tonight")
+        assert intel.suspiciousKeywords == []
+
+
+class TestRegexDeduplication:
+    """Test that repeated findings are collapsed at collection time"""
+    
+    def test_repeated_values_reported_once(self):
+        """Values repeated across turns should appear once per field"""
+        text = "Pay scam@ybl now. Again: scam@ybl. Call 9876543210 or 9876543210"
+        intel = extract_with_regex(text * 3)
+        assert intel.upiIds == ["scam@ybl"]
+        assert intel.phoneNumbers == ["9876543210"]
+
+
+class TestRegexIdExtraction:
+    """Test case/policy/order ID extraction"""
+    
+    def test_case_ids_case_insensitive(self):
+        """Should pick up lower-case prefixes"""
+        intel = extract_with_regex("your case: ab12345 is open")
+        assert intel.caseIds == ["case: ab12345"]
+
+
+class TestIntelligenceMerge:
+    """Test merging of extraction results"""
+    
+    def test_merge_deduplicates(self):
+        """Should union fields without duplicates"""
+        first = ExtractedIntelligence(upiIds=["a@ybl", "b@ybl"], phoneNumbers=["9876543210"])
+        second = ExtractedIntelligence(upiIds=["b@ybl", "c@paytm"])
+        merged = first.merge(second)
+        assert sorted(merged.upiIds) == ["a@ybl", "b@ybl", "c@paytm"]
+        assert merged.phoneNumbers == ["9876543210"]
+    
+    def test_merge_keeps_first_seen_order(self):
+        """Earlier values should stay ahead of ones found later"""
+        first = ExtractedIntelligence(upiIds=["z@ybl", "a@ybl"])
+        second = ExtractedIntelligence(upiIds=["m@paytm", "z@ybl", "b@okaxis"])
+        assert first.merge(second).upiIds == ["z@ybl", "a@ybl", "m@paytm", "b@okaxis"]
+    
+    def test_merge_covers_every_field(self):
+        """Every field should survive a merge"""
+        first = ExtractedIntelligence(**{name: [f"{name}-1"] for name in ExtractedIntelligence.model_fields})
+        merged = first.merge(ExtractedIntelligence())
+        assert merged.to_dict() == first.to_dict()
+    
+    def test_is_empty(self):
+        """Should only be empty when every field is empty"""
+        assert ExtractedIntelligence().is_empty()
+        assert not ExtractedIntelligence(orderNumbers=["ORD12345"]).is_empty()
+
+
+class TestLLMGate:
+    """Test the predicate that skips LLM extraction for trivial text"""
+    
+    def test_trigger_words_match_whole_words(self):
+        """Words that merely start with a trigger word are small talk"""
+        text = "scammer: What an idea, such a payday, I love cardamom tea"
+        assert not needs_llm_extraction(text, extract_with_regex(text))
+        text = "scammer: I sent the details, check your cards"
+        assert needs_llm_extraction(text, extract_with_regex(text))
+    
+    def test_skips_small_talk(self):
+        """Short text with nothing extractable should not reach the LLM"""
+        text = "scammer: Hello madam, good morning"
+        assert not needs_llm_extraction(text, extract_with_regex(text))
+    
+    def test_trigger_word(self):
+        """Payment vocabulary should reach the LLM"""
+        text = "scammer: please pay now"
+        assert needs_llm_extraction(text, extract_with_regex(text))
+    
+    def test_regex_hit(self):
+        """Anything regex found should reach the LLM"""
+        text = "scammer: 9876543210"
+        assert needs_llm_extraction(text, extract_with_regex(text))
+
+
+class TestRegexCoverageGate:
+    """Test skipping the LLM when regex already found hard identifiers"""
+    
+    def test_sufficient_coverage(self):
+        """Two hard identifiers and a short message should skip the LLM"""
+        intel = ExtractedIntelligence(upiIds=["fraud@ybl"], phoneNumbers=["9876543210"])
+        assert regex_coverage_sufficient("Pay now", intel)
+    
+    def test_insufficient_coverage(self):
+        """A single identifier should still use the LLM"""
+        intel = ExtractedIntelligence(upiIds=["fraud@ybl"])
+        assert not regex_coverage_sufficient("Pay now", intel)
+    
+    def test_long_message_uses_llm(self):
+        """Long messages may hold details regex misses"""
+        intel = ExtractedIntelligence(upiIds=["fraud@ybl"], phoneNumbers=["9876543210"])
+        assert not regex_coverage_sufficient("x" * 300, intel)
+
+
+class TestRegexPhoneExtraction:
+    """Test phone number normalisation"""
+    
+    def test_numbers_have_no_separators(self):
+        """Should return bare digits, deduplicated"""
+        intel = extract_with_regex("Call +91-9876543210 or 9876543210, else 8765432109")
+        assert sorted(intel.phoneNumbers) == ["8765432109", "9876543210"]
+
+
+class TestRegexLinkFiltering:
+    """Test safe-domain filtering of extracted links"""
+    
+    def test_safe_domain_skipped(self):
+        """Links on a safe domain or its subdomains are not phishing"""
+        intel = extract_with_regex("See https://support.google.com/help and www.apple.com")
+        assert intel.phishingLinks == []
+    
+    def test_lookalike_domain_reported(self):
+        """A safe domain embedded in another host is still phishing"""
+        intel = extract_with_regex("Login at http://google.com.verify-kyc.ru/login")
+        assert intel.phishingLinks == ["http://google.com.verify-kyc.ru/login"]
+    
+    def test_suffix_lookalike_reported(self):
+        """A host that merely ends with a safe domain's name is still phishing"""
+        intel = extract_with_regex("Visit https://securegoogle.com/kyc now")
+        assert intel.phishingLinks == ["https://securegoogle.com/kyc"]
+    
+    def test_bare_domain_reported(self):
+        """Links without a scheme are still extracted"""
+        intel = extract_with_regex("Open sbi-kyc.in/verify today")
+        assert intel.phishingLinks == ["sbi-kyc.in/verify"]
+    
+    def test_email_domain_not_a_link(self):
+        """The domain part of an email address is not a phishing link"""
+        intel = extract_with_regex("Write to fraud.dept@sbi-secure.in today")
+        assert intel.emailAddresses == ["fraud.dept@sbi-secure.in"]
+        assert intel.phishingLinks == []
+
+
+class TestRegexBankAccounts:
+    """Test bank account length bounds"""
+    
+    def test_length_bounds(self):
+        """Only whole 11-16 digit runs count as accounts"""
+        intel = extract_with_regex("a/c 12345678901 ref 1234567890 txn 12345678901234567")
+        assert intel.bankAccounts == ["12345678901"]
+
+
+class TestIncrementalExtraction:
+    """Test regex extraction over only the messages added since the last turn"""
+    
+    def test_matches_full_scan(self):
+        """Incremental result should equal a full rescan of the history"""
+        history = [
+            {"sender": "scammer", "text": "Pay to fraud@ybl urgently"},
+            {"sender": "user", "text": "Which account?"},
+            {"sender": "scammer", "text": "Call 9876543210 and verify KYC"},
+        ]
+        full = asyncio.run(extract_intelligence(history, use_llm=False))
+        prev = asyncio.run(extract_intelligence(history[:1], use_llm=False))
+        incremental = asyncio.run(extract_intelligence(
+            history, use_llm=False, prev_intel=prev, scanned_count=1
+        ))
+        assert incremental.to_dict() == full.to_dict()
+    
+    def test_skips_scanned_messages(self):
+        """Messages before scanned_count should not be rescanned"""
+        history = [
+            {"sender": "scammer", "text": "Pay to fraud@ybl"},
+            {"sender": "scammer", "text": "Call 9876543210"},
+        ]
+        intel = asyncio.run(extract_intelligence(
+            history, use_llm=False, prev_intel=ExtractedIntelligence(), scanned_count=1
+        ))
+        assert intel.upiIds == []
+        assert intel.phoneNumbers == ["9876543210"]
+
+
+class TestGenerateNotes:
+    """Test deterministic agent notes"""
+    
+    def test_notes_keep_first_seen_order(self):
+        """Items should be listed in the order they were found"""
+        intel = ExtractedIntelligence(phoneNumbers=["9876543210", "9123456789"], suspiciousKeywords=["OTP", "urgent"])
+        notes = asyncio.run(generate_notes([], intel, "bank_fraud"))
+        assert notes.startswith("Bank Fraud scam detected. Tactics: urgency pressure, OTP harvesting.")
+        assert "phone(s): 9876543210, 9123456789" in notes
+    
+    def test_empty_intelligence(self):
+        """Nothing extracted should be reported as such"""
+        notes = asyncio.run(generate_notes([], ExtractedIntelligence()))
+        assert notes == "Suspected scam detected. No specific contact intelligence extracted yet."
@@ -0,0 +1,80 @@
+"""
+LLM Retry Tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.genai import errors
+
+from app.services import llm_retry
+from app.services.llm_retry import generate_json_with_retry
+
+
+def _api_error(code: int, retry_after: str = None) -> errors.APIError:
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    return errors.APIError(
+        code,
+        {"error": {"message": "test", "status": "TEST"}},
+        response=SimpleNamespace(headers=headers)
+    )
+
+
+class TestGenerateJsonWithRetry:
+    """Tests for retried JSON generation."""
+
+    def test_retries_rate_limited_call(self, monkeypatch):
+        """A 429 should be retried until it succeeds."""
+        attempts = []
+        async def fake_generate_json(prompt, **kwargs):
+            attempts.append(prompt)
+            if len(attempts) < 3:
+                raise _api_error(429)
+            return {"ok": True}
+        monkeypatch.setattr(llm_retry, "generate_json", fake_generate_json)
+        monkeypatch.setattr(llm_retry, "BACKOFF_BASE", 0.001)
+
+        assert asyncio.run(generate_json_with_retry(3, prompt="p")) == {"ok": True}
+        assert len(attempts) == 3
+
+    def test_non_retryable_error_raised(self, monkeypatch):
+        """Client errors should reach the caller without retrying."""
+        attempts = []
+        async def fake_generate_json(prompt, **kwargs):
+            attempts.append(prompt)
+            raise _api_error(400)
+        monkeypatch.setattr(llm_retry, "generate_json", fake_generate_json)
+
+        with pytest.raises(errors.APIError):
+            asyncio.run(generate_json_with_retry(3, prompt="p"))
+        assert len(attempts) == 1
+
+    def test_large_retry_after_clamped(self, monkeypatch):
+        """A long Retry-After is capped at BACKOFF_MAX."""
+        delays = []
+        async def fake_sleep(delay):
+            delays.append(delay)
+        attempts = []
+        async def fake_generate_json(prompt, **kwargs):
+            attempts.append(prompt)
+            if len(attempts) == 1:
+                raise _api_error(429, retry_after="60")
+            return {"ok": True}
+        monkeypatch.setattr(llm_retry, "generate_json", fake_generate_json)
+        monkeypatch.setattr(llm_retry.asyncio, "sleep", fake_sleep)
+
+        assert asyncio.run(generate_json_with_retry(3, prompt="p")) == {"ok": True}
+        assert delays == [llm_retry.BACKOFF_MAX]
+
+    def test_gives_up_at_deadline(self, monkeypatch):
+        """No retry starts once the wait would pass the deadline."""
+        attempts = []
+        async def fake_generate_json(prompt, **kwargs):
+            attempts.append(prompt)
+            raise _api_error(503, retry_after="60")
+        monkeypatch.setattr(llm_retry, "generate_json", fake_generate_json)
+
+        with pytest.raises(errors.APIError):
+            asyncio.run(generate_json_with_retry(3, deadline=0.5, prompt="p"))
+        assert len(attempts) == 1
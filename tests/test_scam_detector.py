@@ -0,0 +1,160 @@
+"""
+Scam Detector Tests
+"""
+
+import asyncio
+
+import pytest
+from app.agents import scam_detector
+from app.agents.scam_detector import _looks_benign, _template_key, detect_scam
+
+
+class TestTemplateCache:
+    """Tests for reusing verdicts across messages from the same template."""
+    
+    def test_variable_parts_masked(self):
+        """Messages differing only in numbers or links share a key."""
+        first = "Dear customer, you won Rs 50000 in our lottery. Claim at http://a.xyz/1 or call 9876543210"
+        second = "Dear  Customer, you won Rs 75000 in our lottery. Claim at http://b.top/2 or call 9123456789"
+        assert _template_key(first) == _template_key(second)
+    
+    def test_short_messages_not_shared(self):
+        """Short replies are too generic to share a verdict."""
+        assert _template_key("ok send it") is None
+    
+    def test_confident_verdict_reused(self, monkeypatch):
+        """A confident scam verdict should serve the next same-template message."""
+        calls = []
+        async def fake_generate_json(**kwargs):
+            calls.append(kwargs)
+            return {"is_scam": True, "confidence": 0.95, "scam_type": "lottery", "indicators": []}
+        monkeypatch.setattr(scam_detector, "generate_json", fake_generate_json)
+        
+        template = "Congratulations! You have won a lucky draw prize of Rs {}. Reply with your full name to claim."
+        first = asyncio.run(detect_scam(template.format(40000)))
+        second = asyncio.run(detect_scam(template.format(90000)))
+        assert len(calls) == 1
+        assert second.scam_type == first.scam_type == "lottery"
+    
+    def test_case_and_spacing_variants_hit_exact_cache(self, monkeypatch):
+        """Short messages differing only in case or spacing share a verdict."""
+        calls = []
+        async def fake_generate_json(**kwargs):
+            calls.append(kwargs)
+            return {"is_scam": False, "confidence": 0.3, "scam_type": "none", "indicators": []}
+        monkeypatch.setattr(scam_detector, "generate_json", fake_generate_json)
+        
+        asyncio.run(detect_scam("Did you verify the account?", "case-history"))
+        asyncio.run(detect_scam("did you  VERIFY the account? ", "case-history"))
+        assert len(calls) == 1
+
+
+class TestBenignFastPath:
+    """Tests for skipping Gemini on short small-talk turns."""
+    
+    def test_small_talk_is_benign(self):
+        """A short greeting with no scam words should skip the LLM."""
+        assert _looks_benign("Hello, how are you today?", "")
+    
+    def test_signal_word_in_history(self):
+        """Scam words earlier in the conversation should keep the LLM."""
+        assert not _looks_benign("ok what next?", "SCAMMER: Share the OTP now")
+    
+    def test_numbers_and_handles_not_benign(self):
+        """Digits, UPI handles and links are scam details even without keywords."""
+        assert not _looks_benign("pay 500 to this", "")
+        assert not _looks_benign("use rahul@okaxis", "")
+        assert not _looks_benign("open bit.ly/x", "")
+    
+    def test_long_message_not_benign(self):
+        """Longer messages always go to the LLM."""
+        assert not _looks_benign("hello " * 40, "")
+    
+    def test_benign_verdict_skips_gemini(self, monkeypatch):
+        """detect_scam should answer small talk without calling Gemini."""
+        async def fail_generate_json(**kwargs):
+            raise AssertionError("Gemini should not be called")
+        monkeypatch.setattr(scam_detector, "generate_json", fail_generate_json)
+        
+        analysis = asyncio.run(detect_scam("Good morning sir"))
+        assert not analysis.is_scam
+
+
+class TestDetectionCall:
+    """Tests for the Gemini call settings used by detection."""
+    
+    def test_schema_and_output_cap(self, monkeypatch):
+        """Detection should request structured output with a small decode budget."""
+        calls = []
+        async def fake_generate_json(**kwargs):
+            calls.append(kwargs)
+            return {"is_scam": False, "confidence": 0.1, "scam_type": "none", "indicators": []}
+        monkeypatch.setattr(scam_detector, "generate_json", fake_generate_json)
+        
+        asyncio.run(scam_detector._detect_single("Is the parcel arriving today?", ""))
+        assert calls[0]["response_schema"] is scam_detector.DetectionSchema
+        assert calls[0]["max_tokens"] == scam_detector.DETECTION_MAX_OUTPUT_TOKENS
+        assert calls[0]["thinking_level"] == "minimal"
+
+
+class TestDetectBatch:
+    """Tests for mapping batched verdicts back to their messages."""
+    
+    ITEMS = [("msg one", ""), ("msg two", ""), ("msg three", "")]
+    
+    def _patch(self, monkeypatch, batch_result):
+        singles = []
+        async def fake_generate_json(**kwargs):
+            if kwargs.get("response_schema") is scam_detector.DetectionSchema:
+                singles.append(kwargs["prompt"])
+                return {"is_scam": False, "confidence": 0.1, "scam_type": "none", "indicators": []}
+            if isinstance(batch_result, Exception):
+                raise batch_result
+            return batch_result
+        monkeypatch.setattr(scam_detector, "generate_json", fake_generate_json)
+        return singles
+    
+    def test_results_ordered_by_id(self, monkeypatch):
+        """A complete batch is returned in message order."""
+        singles = self._patch(monkeypatch, [{"id": 3, "is_scam": True}, {"id": 1, "is_scam": False}, {"id": 2, "is_scam": True}])
+        results = asyncio.run(scam_detector._detect_batch(self.ITEMS))
+        assert [r["id"] for r in results] == [1, 2, 3]
+        assert singles == []
+    
+    @pytest.mark.parametrize("ids", [[1, 1, 3], [2, 3, 4]])
+    def test_bad_ids_retried_individually(self, monkeypatch, ids):
+        """Duplicate or out-of-range ids must not be handed to callers."""
+        singles = self._patch(monkeypatch, [{"id": i, "is_scam": True} for i in ids])
+        results = asyncio.run(scam_detector._detect_batch(self.ITEMS))
+        assert len(singles) == 3
+        assert all("id" not in r for r in results)
+    
+    def test_api_error_not_multiplied(self, monkeypatch):
+        """A failed batch call raises instead of retrying every message."""
+        singles = self._patch(monkeypatch, RuntimeError("429 rate limited"))
+        with pytest.raises(RuntimeError):
+            asyncio.run(scam_detector._detect_batch(self.ITEMS))
+        assert singles == []
+
+
+class TestRegexPrefilter:
+    """Tests for the no-LLM verdict on obvious scams."""
+    
+    @pytest.mark.parametrize("message", [
+        "Your OTP for login is 482913. Do not share it with anyone.Team",
+        "urgent: meeting moved to 3pm.see you there",
+        "Hi, I need to verify my exam results on results.nic.in today, urgent!",
+    ])
+    def test_bare_domains_not_flagged(self, message):
+        """Bare-domain matches are left to Gemini instead of a permanent verdict."""
+        assert scam_detector._regex_prefilter(message) is None
+    
+    def test_explicit_link_flagged(self):
+        """An http(s) link plus a pressure keyword is phishing."""
+        analysis = scam_detector._regex_prefilter("URGENT: verify your KYC at http://sbi-kyc.xyz/login")
+        assert analysis is not None and analysis.scam_type == "phishing"
+    
+    def test_upi_flagged(self):
+        """A UPI ID plus a pressure keyword is UPI fraud."""
+        analysis = scam_detector._regex_prefilter("Account blocked, pay fine to fraud@ybl urgently")
+        assert analysis is not None and analysis.scam_type == "upi_fraud"
@@ -0,0 +1,59 @@
+"""
+Semantic Cache Tests
+"""
+
+import asyncio
+
+import pytest
+from app.services.semantic_cache import SemanticCache
+
+np = pytest.importorskip("numpy")
+
+
+class FakeModel:
+    """Bag-of-letters embedding: texts with the same letters are identical."""
+
+    def encode(self, text, normalize_embeddings=True):
+        vector = np.zeros(26, dtype=np.float32)
+        for char in text.lower():
+            if "a" <= char <= "z":
+                vector[ord(char) - ord("a")] += 1
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+
+def make_cache(maxsize=4):
+    cache = SemanticCache("fake", threshold=0.92, maxsize=maxsize)
+    cache._model = FakeModel()
+    return cache
+
+
+class TestSemanticCache:
+    """Tests for the near-duplicate verdict/reply cache."""
+
+    def test_near_duplicate_hits(self):
+        """A reworded copy of a cached message should hit."""
+        cache = make_cache()
+        embedding, payload = asyncio.run(cache.lookup("Your SBI account is blocked, share OTP", "Margaret"))
+        assert payload is None
+        cache.add(embedding, "Margaret", "cached")
+        _, payload = asyncio.run(cache.lookup("your sbi account is blocked share otp now", "Margaret"))
+        assert payload == "cached"
+
+    def test_namespaces_are_separate(self):
+        """A reply cached for one persona must not serve another."""
+        cache = make_cache()
+        embedding, _ = asyncio.run(cache.lookup("Your SBI account is blocked", "Margaret"))
+        cache.add(embedding, "Margaret", "cached")
+        _, payload = asyncio.run(cache.lookup("Your SBI account is blocked", "Kamala"))
+        assert payload is None
+
+    def test_oldest_entry_evicted(self):
+        """A full namespace overwrites its oldest entry."""
+        cache = make_cache(maxsize=1)
+        first, _ = asyncio.run(cache.lookup("lottery prize winner", "Margaret"))
+        cache.add(first, "Margaret", "first")
+        second, _ = asyncio.run(cache.lookup("kyc update pending", "Margaret"))
+        cache.add(second, "Margaret", "second")
+        _, payload = asyncio.run(cache.lookup("lottery prize winner", "Margaret"))
+        assert payload is None
+
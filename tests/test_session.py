@@ -0,0 +1,76 @@
+"""
+Session Tests
+"""
+
+import asyncio
+
+import pytest
+from app.config import get_settings
+from app.services.session import ConversationSession, SessionStore
+
+
+class TestRecentLines:
+    """Tests for the session's pre-formatted recent message window."""
+    
+    def test_keeps_latest_window(self):
+        """Only the latest window of messages should be kept, formatted."""
+        window = get_settings().llm_extraction_window
+        session = ConversationSession(session_id="s1")
+        for i in range(window + 3):
+            session.add_message(sender="scammer", text=f"message {i}")
+        assert len(session.recent_lines) == window
+        assert session.recent_lines[-1] == f"scammer: message {window + 2}"
+    
+    def test_rebuilt_from_messages(self):
+        """A session restored from stored messages should rebuild the window."""
+        session = ConversationSession(session_id="s1")
+        session.add_message(sender="scammer", text="Pay to fraud@ybl")
+        session.add_message(sender="user", text="Which bank?")
+        restored = ConversationSession(session_id="s1", messages=list(session.messages))
+        assert list(restored.recent_lines) == list(session.recent_lines)
+
+
+class TestTranscript:
+    """Tests for the incrementally built session transcript."""
+    
+    def test_matches_full_join(self):
+        """The transcript should equal a join over every message."""
+        session = ConversationSession(session_id="s1")
+        session.add_message(sender="scammer", text="Your account is blocked")
+        session.add_message(sender="user", text="Oh no, what do I do?")
+        assert session.transcript == "SCAMMER: Your account is blocked\nUSER: Oh no, what do I do?"
+    
+    def test_rebuilt_from_messages(self):
+        """A restored session should rebuild the same transcript."""
+        session = ConversationSession(session_id="s1")
+        session.add_message(sender="scammer", text="Pay now")
+        restored = ConversationSession(session_id="s1", messages=list(session.messages))
+        assert restored.transcript == session.transcript
+
+
+class TestSessionLock:
+    """Tests for serializing concurrent requests to one session."""
+    
+    def test_same_session_shares_lock(self):
+        """Concurrent users of one session should get the same lock."""
+        store = SessionStore()
+        lock = store.lock("s1")
+        assert store.lock("s1") is lock
+        assert store.lock("s2") is not lock
+    
+    def test_turns_do_not_interleave(self):
+        """A second turn should wait until the first has finished."""
+        store = SessionStore()
+        events = []
+        
+        async def turn(name):
+            async with store.lock("s1"):
+                events.append(f"{name} start")
+                await asyncio.sleep(0.01)
+                events.append(f"{name} end")
+        
+        async def main():
+            await asyncio.gather(turn("a"), turn("b"))
+        
+        asyncio.run(main())
+        assert events == ["a start", "a end", "b start", "b end"]